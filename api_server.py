@@ -0,0 +1,251 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import numpy as np
+import pandas as pd
+
+import metrics
+import query_engine as qe
+
+# =======================================
+# Headless 조회 API (HTTP/JSON)
+#  - Streamlit 화면 재실행 없이 조건 검색/고객 분석 결과를 제공
+#  - 실행: python api_server.py  (기본 127.0.0.1:8600)
+#
+#  GET /health
+#  GET /exporters        조건 검색 수출자 순위 (페이지)
+#  GET /carriers         조건 검색 컨테이너선사 순위 (페이지)
+#  GET /regions          조건 검색 지역별 컨테이너 요약
+#  GET /customers/<수출자> 고객 상세 분석
+#  GET /profiles         조건 검색 결과 고객 프로필 (페이지, stream=1 이면 NDJSON 스트리밍)
+#
+#  공통 조건 파라미터: start_date, end_date, region, loading_port, arrival_country,
+#                    arrival_port, min_containers
+# =======================================
+API_HOST = os.environ.get("CONTAINER_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("CONTAINER_API_PORT", "8600"))
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class ShipmentData:
+    # 원본 파일 버전이 바뀌었을 때만 다시 읽음
+    def __init__(self, path=qe.PREDEFINED_FILE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._version = None
+        self._df = None
+
+    def get(self):
+        version = qe.data_version(self.path)
+        with self._lock:
+            if version != self._version:
+                with metrics.span("api.load_data"):
+                    self._df = qe.read_shipments(self.path)
+                self._version = version
+            return self._df, self._version
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _json_default(value):
+    if isinstance(value, pd.DataFrame):
+        return value.astype(object).where(value.notna(), None).to_dict('records')
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(value).date().isoformat()
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return None if np.isnan(value) else float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def to_json(payload):
+    return json.dumps(payload, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+
+def _param(query, name, default=None):
+    values = query.get(name)
+    return values[0] if values else default
+
+
+def _int_param(query, name, default):
+    raw = _param(query, name)
+    if raw is None:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        raise BadRequest(f"'{name}' must be an integer")
+
+
+def _date_param(query, name, default):
+    raw = _param(query, name)
+    if raw is None:
+        return default
+    try:
+        return pd.Timestamp(raw)
+    except (ValueError, TypeError):
+        raise BadRequest(f"'{name}' must be a date (YYYY-MM-DD)")
+
+
+def search_conditions(df, query):
+    return {
+        'start_date': _date_param(query, 'start_date', df['선적일'].min()),
+        'end_date': _date_param(query, 'end_date', df['선적일'].max()),
+        'loading_port': _param(query, 'loading_port', 'All'),
+        'arrival_port': _param(query, 'arrival_port', 'All'),
+        'arrival_country': _param(query, 'arrival_country', 'All'),
+        'min_containers': _int_param(query, 'min_containers', 0),
+        'region': _param(query, 'region', 'All'),
+    }
+
+
+def paginate(query):
+    page = max(_int_param(query, 'page', 1), 1)
+    page_size = min(max(_int_param(query, 'page_size', DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    start = (page - 1) * page_size
+    return page, page_size, slice(start, start + page_size)
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    data = None  # serve() 에서 ShipmentData 주입
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = [unquote(p) for p in url.path.strip('/').split('/') if p]
+        route = parts[0] if parts else ''
+
+        try:
+            with metrics.span(f"api.{route or 'root'}"):
+                if route == 'health':
+                    _, version = self.data.get()
+                    self.send_json({'status': 'ok', 'data_version': version})
+                elif route == 'exporters' and len(parts) == 1:
+                    self.send_ranking(query, qe.rank_exporters)
+                elif route == 'carriers' and len(parts) == 1:
+                    self.send_ranking(query, qe.rank_carriers)
+                elif route == 'regions' and len(parts) == 1:
+                    self.send_regions(query)
+                elif route == 'customers' and len(parts) == 2:
+                    self.send_customer(parts[1], query)
+                elif route == 'profiles' and len(parts) == 1:
+                    self.send_profiles(query)
+                else:
+                    self.send_json({'error': 'not found'}, status=404)
+        except BadRequest as e:
+            self.send_json({'error': str(e)}, status=400)
+        except Exception as e:
+            self.send_json({'error': f"{type(e).__name__}: {e}"}, status=500)
+
+    # ---- 라우트 ----
+    def send_ranking(self, query, rank_func):
+        df, version = self.data.get()
+        conditions = search_conditions(df, query)
+        ranking = rank_func(qe.filter_data(df, **conditions))
+        page, page_size, window = paginate(query)
+        self.send_json({
+            'data_version': version,
+            'conditions': conditions,
+            'page': page,
+            'page_size': page_size,
+            'total': len(ranking),
+            'items': ranking.iloc[window],
+        })
+
+    def send_regions(self, query):
+        df, version = self.data.get()
+        conditions = search_conditions(df, query)
+        self.send_json({
+            'data_version': version,
+            'conditions': conditions,
+            'items': qe.region_share(qe.filter_data(df, **conditions)),
+        })
+
+    def send_customer(self, exporter, query):
+        df, version = self.data.get()
+        rows = qe.exporter_rows(
+            df, [exporter],
+            _date_param(query, 'start_date', df['선적일'].min()),
+            _date_param(query, 'end_date', df['선적일'].max()),
+        )
+        if rows.empty:
+            self.send_json({'error': f"no data for exporter '{exporter}'"}, status=404)
+            return
+        self.send_json({'data_version': version, 'profile': qe.customer_profile(rows)})
+
+    def send_profiles(self, query):
+        df, version = self.data.get()
+        filtered = qe.filter_data(df, **search_conditions(df, query))
+
+        if _param(query, 'stream') == '1':
+            self.stream_ndjson(qe.iter_customer_profiles(filtered))
+            return
+
+        ranking = qe.rank_exporters(filtered)
+        page, page_size, window = paginate(query)
+        page_exporters = ranking.iloc[window]
+        groups = filtered.groupby('수출자', sort=False)
+        items = []
+        for rank, exporter, _ in page_exporters.itertuples(index=False):
+            profile = qe.customer_profile(groups.get_group(exporter))
+            profile['rank'] = int(rank)
+            items.append(profile)
+        self.send_json({
+            'data_version': version,
+            'page': page,
+            'page_size': page_size,
+            'total': len(ranking),
+            'items': items,
+        })
+
+    # ---- 응답 ----
+    def send_json(self, payload, status=200):
+        body = to_json(payload)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_ndjson(self, records):
+        # 대량 결과는 한 줄에 한 건씩 chunked 전송 (메모리에 전체를 올리지 않음)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        # 헤더를 보낸 뒤에는 새 응답을 쓸 수 없으므로 오류는 마지막 줄로 알리고 스트림을 종료
+        try:
+            for record in records:
+                self._write_chunk(to_json(record) + b"\n")
+        except OSError:
+            self.close_connection = True  # 클라이언트 연결 끊김
+            return
+        except Exception as e:
+            self._write_chunk(to_json({'error': f"{type(e).__name__}: {e}"}) + b"\n")
+            self.close_connection = True
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host=API_HOST, port=API_PORT, path=qe.PREDEFINED_FILE_PATH):
+    QueryHandler.data = ShipmentData(path)
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    print(f"Container query API: http://{host}:{port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    serve()
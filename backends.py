@@ -0,0 +1,379 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import query_engine as qe
+import regions
+from chunk_store import COUNT_COLUMN, ChunkStore, grouped_sum, merge_partial
+
+try:
+    import duckdb
+except ImportError:  # 선택 의존성
+    duckdb = None
+
+# =======================================
+# 집계 백엔드 (pandas / DuckDB SQL / 디스크 청크)
+#  - 같은 메서드/같은 결과 형태를 제공하므로 서로 교체/교차검증 가능
+#  - CONTAINER_QUERY_BACKEND=duckdb|chunked 로 선택 (duckdb 미설치 시 pandas 사용)
+#  - 조건(conditions)은 query_engine.filter_data 인자와 동일한 dict
+# =======================================
+QUERY_BACKEND = os.environ.get('CONTAINER_QUERY_BACKEND', 'pandas')
+DUCKDB_THREADS = int(os.environ.get('CONTAINER_DUCKDB_THREADS', os.cpu_count() or 4))
+DUCKDB_MEMORY_LIMIT = os.environ.get('CONTAINER_DUCKDB_MEMORY_LIMIT', '2GB')
+# 컨테이너수가 전부 NULL 인 그룹도 pandas sum() 과 같이 0 으로 집계
+_COUNT_SUM = 'COALESCE(SUM("컨테이너수"), 0)'
+
+
+class PandasBackend:
+    name = 'pandas'
+
+    def __init__(self, df):
+        self.df = df
+        self._rows_cache = {}
+        self._lock = threading.Lock()
+
+    def _rows(self, exporters, start_date, end_date):
+        # 분석 화면의 테이블 4개가 같은 행을 쓰므로 마지막 선택만 보관
+        key = (tuple(exporters), str(start_date), str(end_date))
+        with self._lock:
+            if key not in self._rows_cache:
+                self._rows_cache = {key: qe.exporter_rows(self.df, exporters, start_date, end_date)}
+            return self._rows_cache[key]
+
+    def exporter_ranking(self, conditions):
+        return qe.rank_exporters(qe.filter_data(self.df, **conditions))
+
+    def carrier_ranking(self, conditions):
+        return qe.rank_carriers(qe.filter_data(self.df, **conditions))
+
+    def monthly_containers(self, conditions):
+        return qe.monthly_containers(qe.filter_data(self.df, **conditions))
+
+    def region_rollup(self, conditions):
+        return qe.region_share(qe.filter_data(self.df, **conditions))
+
+    def exporter_rows(self, exporters, start_date, end_date):
+        return self._rows(exporters, start_date, end_date)
+
+    def country_share(self, exporters, start_date, end_date):
+        return qe.country_share(self._rows(exporters, start_date, end_date))
+
+    def route_breakdown(self, exporters, start_date, end_date):
+        return qe.route_breakdown(self._rows(exporters, start_date, end_date), with_total=False)
+
+    def country_carrier_share(self, exporters, start_date, end_date):
+        return qe.country_carrier_share(self._rows(exporters, start_date, end_date))
+
+    def country_importer(self, exporters, start_date, end_date):
+        return qe.country_importer(self._rows(exporters, start_date, end_date))
+
+
+class DuckDBBackend:
+    name = 'duckdb'
+
+    def __init__(self, df, data_version):
+        if duckdb is None:
+            raise ImportError("duckdb is not installed")
+
+        self._count_dtype = df['컨테이너수'].dtype
+        self._con = duckdb.connect()
+        self._con.execute(f"SET threads = {DUCKDB_THREADS}")
+        self._con.execute(f"SET memory_limit = '{DUCKDB_MEMORY_LIMIT}'")
+        # 메모리 한도 초과 시 디스크로 내려쓰기 (out-of-core)
+        spill_dir = os.path.dirname(qe.cache_path('duckdb_spill', data_version, 'x'))
+        self._con.execute(f"SET temp_directory = '{spill_dir}'")
+
+        # 컬럼형 스냅샷 (Parquet) 은 데이터 버전당 한 번만 작성
+        snapshot = qe.cache_path('snapshots', qe.row_snapshot_version(data_version), 'shipments.parquet')
+        if not os.path.exists(snapshot):
+            tmp_path = snapshot + '.tmp'
+            self._con.register('shipments_df', df)
+            self._con.execute(f"COPY shipments_df TO '{tmp_path}' (FORMAT PARQUET)")
+            self._con.unregister('shipments_df')
+            os.replace(tmp_path, snapshot)
+        # read_parquet 뷰 → WHERE 조건이 Parquet 스캔으로 내려감 (predicate pushdown)
+        self._con.execute(f"CREATE VIEW shipments AS SELECT * FROM read_parquet('{snapshot}')")
+
+    def _query(self, sql, params):
+        # 커서는 연결을 복제하므로 Streamlit 세션 스레드 간 안전
+        result = self._con.cursor().execute(sql, params).df()
+        # SUM 결과(HUGEINT→float)를 원본 컨테이너수 타입으로 되돌림
+        if '컨테이너수' in result:
+            result['컨테이너수'] = result['컨테이너수'].astype(self._count_dtype)
+        return result
+
+    @staticmethod
+    def _search_where(conditions):
+        clauses = ['"선적일" >= ?', '"선적일" <= ?']
+        params = [pd.to_datetime(conditions['start_date']), pd.to_datetime(conditions['end_date'])]
+        for key, column in [('region', regions.REGION_COLUMN), ('loading_port', '선적항'),
+                            ('arrival_country', '도착지국가'), ('arrival_port', '도착항')]:
+            if conditions.get(key, 'All') != 'All':
+                clauses.append(f'"{column}" = ?')
+                params.append(conditions[key])
+        return " AND ".join(clauses), params
+
+    def _filtered_cte(self, conditions):
+        where, params = self._search_where(conditions)
+        sql = f"""
+            WITH base AS (
+                SELECT * FROM shipments WHERE {where}
+            ),
+            kept AS (
+                SELECT "수출자" FROM base
+                WHERE "수출자" IS NOT NULL
+                GROUP BY "수출자"
+                HAVING {_COUNT_SUM} >= ?
+            ),
+            filtered AS (
+                SELECT base.* FROM base JOIN kept USING ("수출자")
+            )
+        """
+        return sql, params + [conditions['min_containers']]
+
+    def _rank_by(self, conditions, column):
+        cte, params = self._filtered_cte(conditions)
+        sql = cte + f"""
+            SELECT CAST(RANK() OVER (ORDER BY {_COUNT_SUM} DESC) AS DOUBLE) AS "순위",
+                   "{column}", {_COUNT_SUM} AS "컨테이너수"
+            FROM filtered
+            WHERE "{column}" IS NOT NULL
+            GROUP BY "{column}"
+            ORDER BY "컨테이너수" DESC, "{column}"
+        """
+        return self._query(sql, params)
+
+    def exporter_ranking(self, conditions):
+        return self._rank_by(conditions, '수출자')
+
+    def carrier_ranking(self, conditions):
+        return self._rank_by(conditions, '컨테이너선사')
+
+    def monthly_containers(self, conditions):
+        cte, params = self._filtered_cte(conditions)
+        sql = cte + f"""
+            SELECT strftime("선적일", '%Y-%m') AS "월", {_COUNT_SUM} AS "컨테이너수"
+            FROM filtered
+            WHERE "선적일" IS NOT NULL
+            GROUP BY "월"
+            ORDER BY "월"
+        """
+        return self._query(sql, params)
+
+    def region_rollup(self, conditions):
+        cte, params = self._filtered_cte(conditions)
+        sql = cte + f"""
+            SELECT "{regions.REGION_COLUMN}", "도착지국가", {_COUNT_SUM} AS "컨테이너수"
+            FROM filtered
+            WHERE "{regions.REGION_COLUMN}" IS NOT NULL AND "도착지국가" IS NOT NULL
+            GROUP BY "{regions.REGION_COLUMN}", "도착지국가"
+        """
+        return regions.summarize_country_totals(self._query(sql, params))
+
+    def exporter_rows(self, exporters, start_date, end_date):
+        where, params = self._exporter_where(exporters, start_date, end_date)
+        return self._con.cursor().execute(f"SELECT * FROM shipments WHERE {where}", params).df()
+
+    def _exporter_where(self, exporters, start_date, end_date):
+        placeholders = ", ".join("?" for _ in exporters)
+        where = f'"수출자" IN ({placeholders}) AND "선적일" >= ? AND "선적일" <= ?'
+        return where, list(exporters) + [pd.to_datetime(start_date), pd.to_datetime(end_date)]
+
+    def _grouped(self, exporters, start_date, end_date, keys, order_by):
+        where, params = self._exporter_where(exporters, start_date, end_date)
+        columns = ", ".join(f'"{key}"' for key in keys)
+        not_null = " AND ".join(f'"{key}" IS NOT NULL' for key in keys)
+        sql = f"""
+            SELECT {columns}, {_COUNT_SUM} AS "컨테이너수"
+            FROM shipments
+            WHERE {where} AND {not_null}
+            GROUP BY {columns}
+            ORDER BY {order_by}
+        """
+        return self._query(sql, params)
+
+    def country_share(self, exporters, start_date, end_date):
+        result = self._grouped(exporters, start_date, end_date, ['도착지국가'], '"컨테이너수" DESC, "도착지국가"')
+        result['비중(%)'] = (result['컨테이너수'] / result['컨테이너수'].sum() * 100).round(1)
+        return result
+
+    def route_breakdown(self, exporters, start_date, end_date):
+        return self._grouped(exporters, start_date, end_date, ['수출자', '선적항', '도착지국가', '도착항'],
+                             '"컨테이너수" DESC, "수출자", "선적항", "도착지국가", "도착항"')
+
+    def country_carrier_share(self, exporters, start_date, end_date):
+        where, params = self._exporter_where(exporters, start_date, end_date)
+        sql = f"""
+            SELECT "도착지국가", "컨테이너선사", {_COUNT_SUM} AS "컨테이너수",
+                   {_COUNT_SUM} * 100.0 / SUM({_COUNT_SUM}) OVER (PARTITION BY "도착지국가") AS "비중(%)"
+            FROM shipments
+            WHERE {where} AND "도착지국가" IS NOT NULL AND "컨테이너선사" IS NOT NULL
+            GROUP BY "도착지국가", "컨테이너선사"
+            ORDER BY "도착지국가", "컨테이너수" DESC, "컨테이너선사"
+        """
+        result = self._query(sql, params)
+        result['비중(%)'] = result['비중(%)'].round(1)
+        return result
+
+    def country_importer(self, exporters, start_date, end_date):
+        return self._grouped(exporters, start_date, end_date, ['도착지국가', '수입자'],
+                             '"도착지국가", "컨테이너수" DESC, "수입자"')
+
+
+class ChunkedBackend:
+    # 디스크 청크를 하나씩 읽어 부분 집계를 병합 (메모리는 그룹 수에 비례)
+    #  - 최소 컨테이너 수 조건: 1회차에 수출자별 합계, 2회차에 해당 수출자 행만 집계
+    name = 'chunked'
+
+    def __init__(self, data_version, df=None, path=qe.PREDEFINED_FILE_PATH):
+        # df 가 없으면 원본 엑셀을 스트리밍해 청크 저장소 생성 (데이터 버전당 한 번)
+        self.store = ChunkStore(data_version).ensure(df=df, path=path)
+
+    def date_range(self):
+        return self.store.date_range()
+
+    def distinct_rows(self, columns):
+        # 선택지 목록용 컬럼 조합 (청크별 중복 제거 후 병합 → 조합 수에 비례)
+        parts = [chunk[columns].drop_duplicates() for chunk in self.store.chunks()]
+        if not parts:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(parts, ignore_index=True).drop_duplicates().reset_index(drop=True)
+
+    def exporter_totals(self):
+        # 전체 기간 수출자별 컨테이너 수 (수출자 검색 색인용)
+        return self._totals_frame(grouped_sum(self.store.chunks(), '수출자'), ['수출자'])
+
+    def _conditioned(self, conditions):
+        filters = {k: v for k, v in conditions.items() if k != 'min_containers'}
+        for chunk in self.store.chunks(conditions['start_date'], conditions['end_date']):
+            yield qe.filter_conditions(chunk, **filters)
+
+    def iter_filtered(self, conditions):
+        # qe.filter_data 결과를 청크 단위로 나눠서 반환
+        totals = grouped_sum(self._conditioned(conditions), '수출자')
+        if totals is None:
+            return
+        kept = qe.kept_exporters(totals, conditions['min_containers'])
+        for rows in self._conditioned(conditions):
+            yield rows[rows['수출자'].isin(kept)]
+
+    def _totals_frame(self, totals, keys):
+        if totals is None:
+            return pd.DataFrame({**{key: pd.Series([], dtype=str) for key in keys},
+                                 COUNT_COLUMN: pd.Series([], dtype=self.store.count_dtype)})
+        return totals.astype(self.store.count_dtype).sort_index().reset_index()
+
+    def exporter_ranking(self, conditions):
+        totals = grouped_sum(self._conditioned(conditions), '수출자')
+        if totals is not None:
+            totals = totals[qe.kept_exporters(totals, conditions['min_containers'])]
+        return qe.rank_totals(self._totals_frame(totals, ['수출자']), '수출자')
+
+    def carrier_ranking(self, conditions):
+        totals = grouped_sum(self.iter_filtered(conditions), '컨테이너선사')
+        return qe.rank_totals(self._totals_frame(totals, ['컨테이너선사']), '컨테이너선사')
+
+    def monthly_containers(self, conditions):
+        totals = None
+        for rows in self.iter_filtered(conditions):
+            months = rows['선적일'].dt.to_period('M').astype(str).rename('월')
+            totals = merge_partial(totals, rows.groupby(months)[COUNT_COLUMN].sum())
+        return self._totals_frame(totals, ['월'])
+
+    def region_rollup(self, conditions):
+        totals = grouped_sum(self.iter_filtered(conditions), [regions.REGION_COLUMN, '도착지국가'])
+        return regions.summarize_country_totals(self._totals_frame(totals, [regions.REGION_COLUMN, '도착지국가']))
+
+    def exporter_rows(self, exporters, start_date, end_date):
+        # 선택한 수출자 행만 모으므로 메모리에 올려도 작음
+        parts = [qe.exporter_rows(chunk, exporters, start_date, end_date)
+                 for chunk in self.store.chunks(start_date, end_date)]
+        parts = [part for part in parts if not part.empty]
+        if not parts:
+            return pd.DataFrame(columns=self.store.manifest['columns'])
+        rows = pd.concat(parts)
+        return rows.astype({COUNT_COLUMN: self.store.count_dtype})
+
+    def country_share(self, exporters, start_date, end_date):
+        return qe.country_share(self.exporter_rows(exporters, start_date, end_date))
+
+    def route_breakdown(self, exporters, start_date, end_date):
+        return qe.route_breakdown(self.exporter_rows(exporters, start_date, end_date), with_total=False)
+
+    def country_carrier_share(self, exporters, start_date, end_date):
+        return qe.country_carrier_share(self.exporter_rows(exporters, start_date, end_date))
+
+    def country_importer(self, exporters, start_date, end_date):
+        return qe.country_importer(self.exporter_rows(exporters, start_date, end_date))
+
+
+def get_backend(df, data_version, name=QUERY_BACKEND):
+    if name == 'duckdb':
+        if duckdb is not None and data_version is not None:
+            return DuckDBBackend(df, data_version)
+        print("duckdb backend unavailable, falling back to pandas")
+    if name == 'chunked':
+        if data_version is not None:
+            return ChunkedBackend(data_version, df=df)
+        print("chunked backend needs a data version, falling back to pandas")
+    return PandasBackend(df)
+
+
+# =======================================
+# 교차검증 (pandas vs SQL)
+# =======================================
+def _normalized(frame):
+    keys = [c for c in frame.columns if not pd.api.types.is_numeric_dtype(frame[c])]
+    frame = frame.copy()
+    for key in keys:
+        frame[key] = frame[key].astype(str)
+    return frame.sort_values(keys).reset_index(drop=True), keys
+
+
+def frames_match(left, right, atol=0.05):
+    if list(left.columns) != list(right.columns) or len(left) != len(right):
+        return False
+    left, keys = _normalized(left)
+    right, _ = _normalized(right)
+    if not left[keys].equals(right[keys]):
+        return False
+    numeric = [c for c in left.columns if c not in keys]
+    # 0/0 비중: pandas 는 NaN, SQL 은 NULL → 같은 위치의 결측은 일치로 처리
+    return all(np.allclose(left[c].astype(float), right[c].astype(float), atol=atol, equal_nan=True) for c in numeric)
+
+
+def cross_check(reference, candidate, calls):
+    # calls: [(메서드 이름, 인자 tuple), ...] → 불일치한 호출 목록 반환
+    mismatches = []
+    for method, args in calls:
+        if not frames_match(getattr(reference, method)(*args), getattr(candidate, method)(*args)):
+            mismatches.append((method, args))
+    return mismatches
+
+
+if __name__ == "__main__":
+    # python backends.py : 실제 데이터로 pandas 와 duckdb/chunked 결과 비교
+    df = qe.read_shipments()
+    version = qe.data_version()
+    reference = PandasBackend(df)
+    candidates = [ChunkedBackend(version)]  # 원본 엑셀 스트리밍으로 청크 생성
+    if duckdb is not None:
+        candidates.append(DuckDBBackend(df, version))
+
+    start, end = df['선적일'].min(), df['선적일'].max()
+    conditions = {'start_date': start, 'end_date': end, 'loading_port': 'All', 'arrival_port': 'All',
+                  'arrival_country': 'All', 'min_containers': 0, 'region': 'All'}
+    top = reference.exporter_ranking(conditions)['수출자'].head(3).tolist()
+    calls = [('exporter_ranking', (conditions,)), ('carrier_ranking', (conditions,)),
+             ('monthly_containers', (conditions,)), ('region_rollup', (conditions,))]
+    for exporter in top:
+        for method in ['country_share', 'route_breakdown', 'country_carrier_share', 'country_importer']:
+            calls.append((method, ([exporter], start, end)))
+
+    for candidate in candidates:
+        mismatches = cross_check(reference, candidate, calls)
+        print(f"[{candidate.name}] {len(calls) - len(mismatches)}/{len(calls)} checks matched")
+        for method, args in mismatches:
+            print("MISMATCH", candidate.name, method, args)
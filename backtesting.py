@@ -0,0 +1,185 @@
+import argparse
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import query_engine as qe
+
+# =======================================
+# 예측 정확도 백테스트 (rolling-origin)
+#  - 시계열마다 여러 기준일(cutoff)에서 재학습 → 이후 구간 예측 오차 측정
+#  - (시계열, 기준일) 단위 작업을 프로세스 풀(spawn)에서 병렬 실행
+#    화면(Streamlit 스레드)에서 실행할 때는 in_process=True 로 현재 프로세스에서 실행
+#  - 예측 범위(1~3개월)별 MAE / MAPE, 데이터 버전별로 저장
+#  - 실행: python backtesting.py --top 100 --forecaster prophet
+# =======================================
+BACKTEST_CUTOFFS = 3
+BACKTEST_HORIZON_DAYS = 90
+BACKTEST_STEP_DAYS = 30
+BUCKET_DAYS = 30  # 예측 범위 구간 (1개월 단위)
+MIN_TRAIN_POINTS = 30
+
+
+def daily_series(rows):
+    # 고객 분석 화면의 Prophet 입력과 동일한 형태 (ds, y)
+    daily = rows[['선적일', '컨테이너수']].groupby('선적일').sum().reset_index()
+    return daily.rename(columns={'선적일': 'ds', '컨테이너수': 'y'})
+
+
+# ---- 예측기: (학습 데이터, 예측 날짜) → 예측값 ----
+def prophet_forecaster(train_df, future_ds):
+    from prophet import Prophet
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+
+    model = Prophet()
+    model.fit(train_df)
+    forecast = model.predict(pd.DataFrame({'ds': future_ds}))
+    return forecast['yhat'].to_numpy()
+
+
+def naive_forecaster(train_df, future_ds):
+    # 기준선: 최근 28일 선적일 평균
+    recent = train_df[train_df['ds'] > train_df['ds'].max() - pd.Timedelta(days=28)]
+    return np.full(len(future_ds), recent['y'].mean())
+
+
+FORECASTERS = {
+    'prophet': prophet_forecaster,
+    'naive': naive_forecaster,
+}
+
+
+def cutoff_dates(daily_df, n_cutoffs=BACKTEST_CUTOFFS, horizon_days=BACKTEST_HORIZON_DAYS, step_days=BACKTEST_STEP_DAYS):
+    last_cutoff = daily_df['ds'].max() - pd.Timedelta(days=horizon_days)
+    cutoffs = [last_cutoff - pd.Timedelta(days=step_days * i) for i in range(n_cutoffs)]
+    return sorted(c for c in cutoffs if (daily_df['ds'] <= c).sum() >= MIN_TRAIN_POINTS)
+
+
+def has_enough_history(daily_df, n_cutoffs=BACKTEST_CUTOFFS, horizon_days=BACKTEST_HORIZON_DAYS,
+                       step_days=BACKTEST_STEP_DAYS):
+    # 학습 데이터가 MIN_TRAIN_POINTS 이상인 기준일이 하나도 없으면 평가 불가
+    return not daily_df.empty and bool(cutoff_dates(daily_df, n_cutoffs, horizon_days, step_days))
+
+
+def _evaluate_cutoff(task):
+    key, daily_df, cutoff, forecaster, horizon_days = task
+    train_df = daily_df[daily_df['ds'] <= cutoff]
+    test_df = daily_df[(daily_df['ds'] > cutoff) & (daily_df['ds'] <= cutoff + pd.Timedelta(days=horizon_days))]
+    if test_df.empty:
+        return None
+
+    y_pred = FORECASTERS[forecaster](train_df, test_df['ds'])
+    y_true = test_df['y'].to_numpy(dtype=float)
+    days_ahead = (test_df['ds'] - cutoff).dt.days.to_numpy()
+    return pd.DataFrame({
+        'key': key,
+        'cutoff': cutoff,
+        'horizon': (days_ahead - 1) // BUCKET_DAYS + 1,
+        'ae': np.abs(y_true - y_pred),
+        'ape': np.where(y_true > 0, np.abs(y_true - y_pred) / np.where(y_true > 0, y_true, 1), np.nan),
+    })
+
+
+def run_backtests(series, forecaster='prophet', n_cutoffs=BACKTEST_CUTOFFS,
+                  horizon_days=BACKTEST_HORIZON_DAYS, step_days=BACKTEST_STEP_DAYS, max_workers=None,
+                  in_process=False):
+    # series: {키(수출자 등): daily_df}
+    tasks = [
+        (key, daily_df, cutoff, forecaster, horizon_days)
+        for key, daily_df in series.items()
+        for cutoff in cutoff_dates(daily_df, n_cutoffs, horizon_days, step_days)
+    ]
+    if not tasks:
+        return pd.DataFrame(columns=['key', 'forecaster', 'horizon', 'MAE', 'MAPE(%)', 'cutoffs'])
+
+    if in_process:
+        results = map(_evaluate_cutoff, tasks)
+    else:
+        # 스레드가 있는 부모 프로세스를 fork 하지 않도록 spawn 사용
+        pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+        with pool:
+            results = list(pool.map(_evaluate_cutoff, tasks))
+    errors = [frame for frame in results if frame is not None]
+    if not errors:
+        return pd.DataFrame(columns=['key', 'forecaster', 'horizon', 'MAE', 'MAPE(%)', 'cutoffs'])
+
+    errors = pd.concat(errors, ignore_index=True)
+    summary = errors.groupby(['key', 'horizon']).agg(
+        MAE=('ae', 'mean'),
+        MAPE=('ape', 'mean'),
+        cutoffs=('cutoff', 'nunique'),
+    ).reset_index()
+    summary['MAPE'] = (summary['MAPE'] * 100).round(1)
+    summary['MAE'] = summary['MAE'].round(1)
+    summary.insert(1, 'forecaster', forecaster)
+    return summary.rename(columns={'MAPE': 'MAPE(%)'})
+
+
+# ---- 데이터 버전별 저장 ----
+def _store_path(data_version, forecaster):
+    return qe.cache_path('backtests', data_version, f'{forecaster}.pkl')
+
+
+def load_backtests(data_version, forecaster='prophet'):
+    path = _store_path(data_version, forecaster)
+    if not os.path.exists(path):
+        return None
+    return pd.read_pickle(path)
+
+
+def save_backtests(summary, data_version, forecaster='prophet'):
+    # 기존 결과에 병합 (다시 실행한 키는 교체)
+    existing = load_backtests(data_version, forecaster)
+    if existing is not None:
+        existing = existing[~existing['key'].isin(summary['key'])]
+        summary = pd.concat([existing, summary], ignore_index=True)
+    path = _store_path(data_version, forecaster)
+    summary.to_pickle(path + '.tmp')
+    os.replace(path + '.tmp', path)
+    return summary
+
+
+def exporter_backtest(data_version, exporter, forecaster='prophet'):
+    summary = load_backtests(data_version, forecaster)
+    if summary is None:
+        return None
+    result = summary[summary['key'] == exporter]
+    return None if result.empty else result.reset_index(drop=True)
+
+
+def backtest_exporters(df, exporters, data_version, forecaster='prophet', **kwargs):
+    series = {
+        exporter: daily_series(rows)
+        for exporter, rows in df[df['수출자'].isin(exporters)].groupby('수출자')
+    }
+    summary = run_backtests(series, forecaster, **kwargs)
+    return save_backtests(summary, data_version, forecaster)
+
+
+def compare_forecasters(data_version):
+    # 저장된 예측기별 결과를 예측 범위 기준으로 비교
+    frames = [load_backtests(data_version, name) for name in FORECASTERS]
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        return None
+    combined = pd.concat(frames, ignore_index=True)
+    return combined.groupby(['forecaster', 'horizon'])[['MAE', 'MAPE(%)']].median().reset_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest for exporter forecasts")
+    parser.add_argument('--top', type=int, default=100, help="컨테이너 수 상위 N개 수출자")
+    parser.add_argument('--forecaster', choices=sorted(FORECASTERS), default='prophet')
+    parser.add_argument('--cutoffs', type=int, default=BACKTEST_CUTOFFS)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    df = qe.read_shipments()
+    version = qe.data_version()
+    top = df.groupby('수출자')['컨테이너수'].sum().nlargest(args.top).index.tolist()
+    backtest_exporters(df, top, version, args.forecaster, n_cutoffs=args.cutoffs, max_workers=args.workers)
+    print(compare_forecasters(version))
@@ -0,0 +1,182 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+import query_engine as qe
+import regions
+
+# =======================================
+# 디스크 청크 저장소 (out-of-core 조회용)
+#  - 원본 엑셀을 한 번에 읽지 않고 CHUNK_ROWS 행씩 스트리밍해 청크 파일로 저장
+#    .cache/chunks/<data_version>-<ROW_SCHEMA>/part-00000.pkl ... + manifest.json
+#  - 청크별 선적일 최소/최대를 manifest 에 기록 → 기간 밖 청크는 읽지 않음
+#  - 셀 변환/타입 추론은 pandas.read_excel 과 동일 (같은 TextParser 사용),
+#    지역 컬럼도 qe.read_shipments 와 같이 적재 시점에 추가
+# =======================================
+CHUNK_ROWS = int(os.environ.get('CONTAINER_CHUNK_ROWS', '200000'))
+DATE_COLUMN = '선적일'
+COUNT_COLUMN = '컨테이너수'
+
+
+def _convert_cell(cell):
+    # pandas 의 openpyxl 셀 변환과 동일: 빈 셀 "", 오류 NaN, 정수값 float → int
+    from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+    if cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
+
+
+def _parse_rows(header, rows):
+    width = len(header)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    chunk = TextParser([header] + rows, header=0, parse_dates=[DATE_COLUMN]).read()
+    return regions.add_region(chunk)
+
+
+def iter_excel_chunks(path=qe.PREDEFINED_FILE_PATH, chunk_rows=CHUNK_ROWS):
+    # read_only 모드: 시트 전체를 메모리에 올리지 않고 행 단위로 읽음
+    import openpyxl
+
+    book = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = book.worksheets[0].iter_rows()
+        header = [_convert_cell(cell) for cell in next(rows)]
+        while header and header[-1] == "":
+            header.pop()
+        buffer = []
+        for row in rows:
+            buffer.append([_convert_cell(cell) for cell in row][:len(header)])
+            if len(buffer) == chunk_rows:
+                yield _parse_rows(header, buffer)
+                buffer = []
+        if buffer:
+            yield _parse_rows(header, buffer)
+    finally:
+        book.close()
+
+
+def iter_frame_chunks(df, chunk_rows=CHUNK_ROWS):
+    # 이미 메모리에 있는 데이터로 청크 저장소를 만들 때
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].reset_index(drop=True)
+
+
+class ChunkStore:
+    def __init__(self, data_version):
+        self.data_version = data_version
+        self.manifest_path = qe.cache_path('chunks', qe.row_snapshot_version(data_version), 'manifest.json')
+        self.directory = os.path.dirname(self.manifest_path)
+        self._manifest = None
+
+    @property
+    def ready(self):
+        return os.path.exists(self.manifest_path)
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self._manifest = json.load(f)
+        return self._manifest
+
+    @property
+    def count_dtype(self):
+        # 청크마다 추론된 컨테이너수 타입을 합친 결과 (전체를 한 번에 읽었을 때의 타입)
+        return np.dtype(self.manifest['count_dtype'])
+
+    def date_range(self):
+        # manifest 의 청크별 최소/최대 선적일로 전체 기간 계산 (청크를 읽지 않음)
+        parts = [part for part in self.manifest['parts'] if part['min_date'] is not None]
+        if not parts:
+            return pd.NaT, pd.NaT
+        return (min(pd.Timestamp(part['min_date']) for part in parts),
+                max(pd.Timestamp(part['max_date']) for part in parts))
+
+    def write(self, chunks):
+        parts = []
+        dtypes = []
+        columns = []
+        offset = 0
+        for i, chunk in enumerate(chunks):
+            # 전체 데이터 기준 행 번호를 index 로 유지
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            filename = f"part-{i:05d}.pkl"
+            path = os.path.join(self.directory, filename)
+            chunk.to_pickle(path + '.tmp')
+            os.replace(path + '.tmp', path)
+
+            dates = chunk[DATE_COLUMN]
+            parts.append({
+                'file': filename,
+                'rows': len(chunk),
+                'min_date': None if dates.isna().all() else dates.min().isoformat(),
+                'max_date': None if dates.isna().all() else dates.max().isoformat(),
+            })
+            dtypes.append(chunk[COUNT_COLUMN].dtype)
+            columns = columns or [str(c) for c in chunk.columns]
+            offset += len(chunk)
+
+        manifest = {
+            'data_version': self.data_version,
+            'rows': offset,
+            'columns': columns,
+            'count_dtype': str(np.result_type(*dtypes)) if dtypes else 'int64',
+            'parts': parts,
+        }
+        # manifest 는 마지막에 기록 → 중간에 실패하면 다음 실행에서 다시 생성
+        with open(self.manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(self.manifest_path + '.tmp', self.manifest_path)
+        self._manifest = manifest
+
+    def ensure(self, df=None, path=qe.PREDEFINED_FILE_PATH, chunk_rows=CHUNK_ROWS):
+        if not self.ready:
+            chunks = iter_frame_chunks(df, chunk_rows) if df is not None else iter_excel_chunks(path, chunk_rows)
+            self.write(chunks)
+        return self
+
+    def chunks(self, start_date=None, end_date=None):
+        # 기간과 겹치는 청크만 순서대로 읽음 (한 번에 한 청크만 메모리에 유지)
+        start = pd.to_datetime(start_date) if start_date is not None else None
+        end = pd.to_datetime(end_date) if end_date is not None else None
+        for part in self.manifest['parts']:
+            if part['min_date'] is None:
+                continue
+            if end is not None and pd.Timestamp(part['min_date']) > end:
+                continue
+            if start is not None and pd.Timestamp(part['max_date']) < start:
+                continue
+            yield pd.read_pickle(os.path.join(self.directory, part['file']))
+
+
+# =======================================
+# 부분 집계 병합
+# =======================================
+def merge_partial(total, partial):
+    # 청크별 groupby 합계를 누적 (메모리는 그룹 수에 비례)
+    if total is None:
+        return partial
+    levels = list(range(partial.index.nlevels))
+    return pd.concat([total, partial]).groupby(level=levels).sum()
+
+
+def grouped_sum(chunks, keys):
+    total = None
+    for chunk in chunks:
+        total = merge_partial(total, chunk.groupby(keys)[COUNT_COLUMN].sum())
+    return total
+
+
+if __name__ == "__main__":
+    # python chunk_store.py : 현재 데이터 버전의 청크 저장소를 미리 생성
+    store = ChunkStore(qe.data_version()).ensure()
+    print(f"{store.manifest['rows']} rows in {len(store.manifest['parts'])} chunks -> {store.directory}")
@@ -9,9 +9,21 @@ import matplotlib.font_manager as fm
 # import koreanize_matplotlib
 import platform
 import json
-from sklearn.metrics import mean_absolute_error
 from prophet import Prophet
 import os
+import time
+import metrics
+import query_engine as qe
+from search_index import ExporterSearchIndex
+from backends import QUERY_BACKEND, get_backend
+import forecasting
+import backtesting
+from summary_store import DailySummaryStore
+import leaderboard
+from market_matrix import build_market_matrices
+from network import ExporterImporterNetwork
+import reports
+import regions
 
 # =======================================
 # 기본 설정 (폰트/마이너스 깨짐 방지)
@@ -28,6 +40,7 @@ client = OpenAI(api_key=st.secrets["openai"]["api_key"])
 # 인증 ID 목록
 # =======================================
 ALLOWED_IDS = ['hansehyuk']
+ADMIN_IDS = ['hansehyuk']  # 성능 디버그 패널 접근 가능 ID
 
 # =======================================
 # 세션 상태 기본값
@@ -64,6 +77,7 @@ def show_login():
     if enter_clicked:
         if user_id in ALLOWED_IDS:
             st.session_state.authorized = True
+            st.session_state.user_id = user_id
             st.rerun()
         elif user_id:
             st.warning("Unregistered ID. Please contact the administrator.")
@@ -100,24 +114,341 @@ def show_login():
 # =======================================
 # 데이터 관련 설정/함수
 # =======================================
-PREDEFINED_FILE_PATH = 'combined4.xlsx'
+PREDEFINED_FILE_PATH = qe.PREDEFINED_FILE_PATH
+EXPORTER_SEARCH_LIMIT = 20  # 고객 상세 검색 자동완성 최대 표시 수
+# 디스크 청크 모드: 원본 전체(df)를 메모리에 올리지 않고 청크 저장소로만 조회
+#  - 전체 행이 필요한 패널(수입자 네트워크/선사 점유율/성장 순위/데이터 개요 지표)은 비활성화
+OUT_OF_CORE = QUERY_BACKEND == 'chunked'
+OPTION_COLUMNS = ['선적항', regions.REGION_COLUMN, '도착지국가', '도착항']
 
+
+def current_data_version():
+    try:
+        return qe.data_version(PREDEFINED_FILE_PATH)
+    except OSError:
+        return None
+
+
+# data_version 이 바뀌면 (원본 파일 교체) 캐시가 새로 만들어짐
 @st.cache_data
-def load_data():
+def load_data(data_version):
+    metrics.inc("cache_misses_total", cache="load_data")
     try:
-        df = pd.read_excel(PREDEFINED_FILE_PATH, parse_dates=['선적일'], engine='openpyxl')
+        with metrics.span("load_data.read_excel"):
+            df = qe.read_shipments(PREDEFINED_FILE_PATH)
         return df
     except Exception as e:
         st.error(f"파일 로드 중 오류 발생: {e}")
         return None
 
 
-def show_data_overview(df, start_date=None, end_date=None):
+@st.cache_resource
+def get_exporter_index(data_version, _df, _backend=None):
+    metrics.inc("cache_misses_total", cache="exporter_index")
+    with metrics.span("exporter_index.build"):
+        # 디스크 청크 모드: 청크별 수출자 합계로 색인
+        return ExporterSearchIndex.from_frame(_df if _df is not None else _backend.exporter_totals())
+
+
+@st.cache_resource
+def get_query_backend(data_version, _df):
+    # CONTAINER_QUERY_BACKEND 환경변수로 pandas / duckdb / chunked 선택 (chunked 는 _df 없이 생성)
+    metrics.inc("cache_misses_total", cache="query_backend")
+    with metrics.span("query_backend.build"):
+        return get_backend(_df, data_version)
+
+
+# 배치 작업(python forecasting.py) 결과를 읽기만 함 - 작업 후 5분 내 반영
+@st.cache_resource(ttl=300)
+def get_market_forecasts(data_version):
+    metrics.inc("cache_misses_total", cache="market_forecasts")
+    if data_version is None:
+        return None
+    return forecasting.load_market_forecasts(data_version)
+
+
+@st.cache_resource
+def get_summary_store(data_version, _df):
+    metrics.inc("cache_misses_total", cache="summary_store")
+    with metrics.span("summary_store.build"):
+        return DailySummaryStore(_df)
+
+
+@st.cache_data
+def get_growth_leaderboard(data_version, loading_port, arrival_country, arrival_port, region, _df):
+    # 조건별 월별 행렬은 leaderboard 저장소에서 증분 갱신
+    metrics.inc("cache_misses_total", cache="growth_leaderboard")
+    with metrics.span("leaderboard.build"):
+        return leaderboard.growth_leaderboard(_df, data_version, loading_port, arrival_country, arrival_port,
+                                              region=region)
+
+
+@st.cache_resource
+def get_market_matrices(data_version, _df):
+    metrics.inc("cache_misses_total", cache="market_matrices")
+    with metrics.span("market_matrix.build"):
+        return build_market_matrices(_df)
+
+
+@st.cache_resource
+def get_importer_network(data_version, _df):
+    metrics.inc("cache_misses_total", cache="importer_network")
+    with metrics.span("importer_network.build"):
+        return ExporterImporterNetwork(_df), ExporterSearchIndex.from_frame(_df, name_col='수입자')
+
+
+@st.cache_data
+def get_filter_options(data_version, _df, _backend=None):
+    # 사이드바 선택지 (데이터 버전당 한 번 계산)
+    #  - 디스크 청크 모드: 기간은 청크 manifest, 선택지는 청크별 고유 조합에서 계산
+    metrics.inc("cache_misses_total", cache="filter_options")
+    if _df is None:
+        min_date, max_date = _backend.date_range()
+        _df = _backend.distinct_rows(OPTION_COLUMNS)
+    else:
+        min_date, max_date = _df['선적일'].min(), _df['선적일'].max()
+    ports = _df.dropna(subset=['도착지국가', '도착항'])
+    return {
+        'min_date': min_date,
+        'max_date': max_date,
+        'loading_ports': ['All'] + sorted(_df['선적항'].dropna().astype(str).unique().tolist()),
+        'regions': ['All'] + [region for region in regions.REGION_ORDER + [regions.UNKNOWN_REGION]
+                              if region in set(_df[regions.REGION_COLUMN].dropna())],
+        'arrival_countries': ['All'] + sorted(_df['도착지국가'].dropna().astype(str).unique().tolist()),
+        'countries_by_region': {
+            str(region): ['All'] + sorted(group.astype(str).unique().tolist())
+            for region, group in _df.dropna(subset=['도착지국가']).groupby(regions.REGION_COLUMN)['도착지국가']
+        },
+        'arrival_ports': ['All'] + sorted(_df['도착항'].dropna().astype(str).unique().tolist()),
+        'ports_by_country': {
+            str(country): ['All'] + sorted(group.astype(str).unique().tolist())
+            for country, group in ports.groupby('도착지국가')['도착항']
+        },
+    }
+
+
+@st.cache_data
+def get_exporter_history(data_version, exporter, _df, _backend):
+    # 보고서/예측 정확도 평가용 수출자 전체 기간 행
+    #  - 디스크 청크 모드: 청크를 순서대로 읽어 해당 수출자 행만 모음
+    metrics.inc("cache_misses_total", cache="exporter_history")
+    if _df is not None:
+        return _df[_df['수출자'] == exporter]
+    return _backend.exporter_rows([exporter], *_backend.date_range())
+
+
+def show_out_of_core_notice(feature):
+    st.info(f"디스크 청크 모드(CONTAINER_QUERY_BACKEND=chunked)에서는 전체 데이터가 필요한 {feature} 기능을 제공하지 않습니다.")
+
+
+@st.cache_data
+def get_search_rankings(data_version, backend_name, conditions, _backend):
+    # 적용된 검색 조건별 고객/선사 순위 (조건이 바뀔 때만 다시 계산)
+    metrics.inc("cache_misses_total", cache="search_rankings")
+    with metrics.span(f"search.exporter_ranking.{backend_name}"):
+        grouped = _backend.exporter_ranking(conditions)
+    with metrics.span(f"search.carrier_ranking.{backend_name}"):
+        port_grouped = _backend.carrier_ranking(conditions)
+    with metrics.span(f"search.monthly_containers.{backend_name}"):
+        monthly = _backend.monthly_containers(conditions)
+    with metrics.span(f"search.region_rollup.{backend_name}"):
+        region_rollup = _backend.region_rollup(conditions)
+    return grouped, port_grouped, monthly, region_rollup
+
+
+@st.cache_data
+def get_exporter_forecast(data_version, exporters, period, _daily_df):
+    # 수출자 + 분석 기간별 Prophet 예측 (월별 실적/예측 결합 표)
+    metrics.inc("cache_misses_total", cache="exporter_forecast")
+
+    # ✅ Prophet 모델 학습
+    with metrics.span("prophet.fit"):
+        model = Prophet()
+        model.fit(_daily_df)
+
+    # ✅ 향후 3개월 (90일) 예측
+    future = model.make_future_dataframe(periods=90)
+    forecast = model.predict(future)
+
+    # [1] 실제값 월별 집계
+    actual_df = _daily_df.copy()
+    actual_df['월'] = actual_df['ds'].dt.to_period('M').astype(str)
+    monthly_actual = actual_df.groupby('월')['y'].sum().reset_index()
+    monthly_actual = monthly_actual.rename(columns={'y': '실적'})
+
+    # [2] 예측값 중 미래만 필터
+    last_actual_date = _daily_df['ds'].max()
+    forecast_future = forecast[forecast['ds'] > last_actual_date].copy()
+    forecast_future['월'] = forecast_future['ds'].dt.to_period('M').astype(str)
+    monthly_forecast = forecast_future.groupby('월')['yhat'].sum().reset_index()
+    monthly_forecast = monthly_forecast.rename(columns={'yhat': '예측'})
+
+    # ✅ 예측값을 정수로 반올림
+    monthly_forecast['예측'] = monthly_forecast['예측'].round(0).astype(int)
+    # [3] 실적 + 예측 결합
+    combined = pd.merge(monthly_actual, monthly_forecast, on='월', how='outer')
+
+    # ✅ 예측 구간이 아닌 곳은 예측값 NaN 처리 (시각적으로 깔끔하게 분리됨)
+    combined['예측'] = combined.apply(
+        lambda row: row['예측'] if row['월'] in monthly_forecast['월'].values else None,
+        axis=1
+    )
+    return combined
+
+
+def cached_call(cache_name, func, *args, **kwargs):
+    # st.cache_data 함수 호출 + 캐시 히트/미스 카운트
+    #  - 미스는 캐시 함수 본문에서 cache_misses_total 을 올림
+    before = metrics.REGISTRY.counter_value("cache_misses_total", cache=cache_name)
+    result = func(*args, **kwargs)
+    metrics.inc("cache_requests_total", cache=cache_name)
+    if metrics.REGISTRY.counter_value("cache_misses_total", cache=cache_name) == before:
+        metrics.inc("cache_hits_total", cache=cache_name)
+    return result
+
+
+@st.cache_resource
+def ensure_metrics_server():
+    # Prometheus 엔드포인트는 프로세스당 한 번만 띄움
+    try:
+        return metrics.start_metrics_server()
+    except OSError:
+        return None
+
+
+def show_metrics_panel():
+    # 관리자 전용 성능 디버그 패널
+    if st.session_state.get('user_id') not in ADMIN_IDS:
+        return
+
+    with st.sidebar.expander("🛠️ 성능 디버그", expanded=False):
+        span_rows = metrics.REGISTRY.span_summary()
+        if span_rows:
+            span_df = pd.DataFrame(span_rows)[['stage', 'count', 'p50_ms', 'p95_ms', 'max_ms']].round(1)
+            st.markdown("⏱️ **구간별 소요시간 (ms)**")
+            st.dataframe(span_df, hide_index=True)
+        counter_rows = metrics.REGISTRY.counter_summary()
+        if counter_rows:
+            counter_df = pd.DataFrame([
+                {'name': row['name'],
+                 'labels': ", ".join(f"{k}={v}" for k, v in row['labels'].items()),
+                 'value': row['value']}
+                for row in counter_rows
+            ])
+            st.markdown("🔢 **카운터**")
+            st.dataframe(counter_df, hide_index=True)
+        st.caption(f"Prometheus: http://127.0.0.1:{metrics.METRICS_PORT}/metrics")
+        if st.button("초기화", key="reset_metrics"):
+            metrics.REGISTRY.reset()
+            st.rerun()
+
+
+def plot_actual_forecast(combined):
+    # 실적: 검정 실선 / 예측: 파란 점선 (고객 분석 예측 그래프와 동일 스타일)
+    fig, ax = plt.subplots(figsize=(10, 4))
+    ax.plot(combined['월'], combined['실적'], marker='o', label='ACT', color='black', linewidth=1.0)
+    ax.plot(combined['월'], combined['예측'], marker='o', linestyle='--', label='FCT', color='blue', linewidth=1.0)
+
+    last_actual = combined[combined['실적'].notna()].iloc[-1]
+    first_pred = combined[combined['예측'].notna()].iloc[0]
+    ax.plot(
+        [last_actual['월'], first_pred['월']],
+        [last_actual['실적'], first_pred['예측']],
+        linestyle='--',
+        linewidth=1.0,
+        color='blue'
+    )
+    ax.legend()
+    ax.tick_params(axis='x', rotation=45)
+    with metrics.span("plot.render"):
+        st.pyplot(fig)
+
+
+def show_market_forecasts(data_version, conditions):
+    results = cached_call("market_forecasts", get_market_forecasts, data_version)
+    if results is None:
+        st.info("저장된 시장 예측이 없습니다. 관리자에게 `python forecasting.py` 실행을 요청해 주세요.")
+        return
+
+    lanes = [
+        ('🗺️ 지역', '지역', conditions['region']),
+        ('🌎 도착지국가', '도착지국가', conditions['arrival_country']),
+        ('⚓ 도착항', '도착항', conditions['arrival_port']),
+    ]
+    carrier_options = [c for c in results['컨테이너선사']['forecast'].columns if c != forecasting.UNKNOWN_KEY]
+    carrier = st.selectbox("🚢 컨테이너선사", ['선택 안 함'] + carrier_options, key="forecast_carrier")
+    if carrier != '선택 안 함':
+        lanes.append(('🚢 컨테이너선사', '컨테이너선사', carrier))
+
+    shown = False
+    for label, dimension, value in lanes:
+        # 지역 차원 추가 전에 저장된 예측에는 '지역' 결과가 없음
+        if value == 'All' or dimension not in results or value not in results[dimension]['forecast'].columns:
+            continue
+        st.markdown(f"{label}: **{value}**")
+        combined = forecasting.lane_forecast(results, dimension, value)
+        plot_actual_forecast(combined)
+        st.dataframe(combined.set_index('월').T)
+        shown = True
+
+    if not shown:
+        st.markdown(f"🌐 **{forecasting.TOTAL_KEY}** (지역/도착지국가/도착항 조건 또는 선사를 선택하면 해당 시장 예측 표시)")
+        plot_actual_forecast(forecasting.lane_forecast(results, forecasting.TOTAL_KEY, forecasting.TOTAL_KEY))
+
+
+def show_market_share(matrices, conditions):
+    # 선사 x 시장 점유율 (전체 시장 기준, 월 단위 기간)
+    market_column = st.radio("시장 기준", list(matrices), horizontal=True, key="share_market_column")
+    matrix = matrices[market_column]
+
+    start_date, end_date = conditions['start_date'], conditions['end_date']
+    with metrics.span("market_matrix.heatmap"):
+        heatmap_df = matrix.heatmap_frame(start_date, end_date)
+    if heatmap_df.empty:
+        st.warning("조건에 맞는 데이터가 없습니다.")
+        return
+
+    fig, ax = plt.subplots(figsize=(12, 5))
+    sns.heatmap(heatmap_df, annot=True, fmt='.1f', cmap='Blues', cbar=False, ax=ax, annot_kws={'fontsize': 8})
+    ax.set_xlabel("")
+    ax.set_ylabel("")
+    ax.tick_params(axis='x', rotation=45)
+    with metrics.span("plot.render"):
+        st.pyplot(fig)
+    st.caption("물량 상위 시장별 선사 점유율(%) · 기간은 월 단위로 적용됩니다.")
+
+    selected_market = {
+        '지역': conditions['region'],
+        '도착지국가': conditions['arrival_country'],
+        '도착항': conditions['arrival_port'],
+    }.get(market_column, 'All')
+    if selected_market != 'All':
+        st.markdown(f"🚢 **{selected_market} 선사 점유율**")
+        st.dataframe(matrix.share_table(start_date, end_date, market=selected_market))
+
+
+def show_importer_lookup(network, importer_index):
+    # 수입자 → 해당 수입자에게 선적하는 국내 수출자 역조회
+    importer_query = st.text_input("수입자 검색", placeholder="Importer Name", key="importer_query")
+    if not importer_query:
+        return
+    matches = importer_index.search(importer_query, limit=EXPORTER_SEARCH_LIMIT)
+    if not matches:
+        st.warning("일치하는 수입자가 없습니다.")
+        return
+    importer = st.selectbox("수입자 선택", matches, key="importer_selected")
+    with metrics.span("importer_network.reverse_lookup"):
+        exporters = network.exporters_for_importer(importer)
+    st.markdown(f"🧑 **{importer}** 에 선적하는 수출자 {len(exporters)}개")
+    st.dataframe(exporters)
+
+
+def show_data_overview(summary_store, start_date=None, end_date=None):
     # 날짜가 없으면 데이터 기준 min/max로 설정
     if start_date is None:
-        start_date = df['선적일'].min()
+        start_date = summary_store.first_day
     if end_date is None:
-        end_date = df['선적일'].max()
+        end_date = summary_store.last_day
 
     # 날짜 문자열 포맷팅 (datetime -> yyyy-mm-dd)
     start_str = start_date.strftime("%Y-%m-%d") if hasattr(start_date, 'strftime') else str(start_date)
@@ -125,12 +456,15 @@ def show_data_overview(df, start_date=None, end_date=None):
 
     st.markdown(f"✅ **분석 데이터 개요 ({start_str} ~ {end_str})**")
 
-    total_records = len(df)
-    total_exporters = df['수출자'].nunique()
-    total_loading_ports = df['선적항'].nunique()
-    total_countries = df['도착지국가'].nunique()
-    total_arrival_ports = df['도착항'].nunique()
-    total_containers = df['컨테이너수'].sum()
+    # 일별 요약 저장소에서 기간 합계/고유 수 조회 (전체 행 스캔 없음)
+    with metrics.span("overview.metrics"):
+        summary = summary_store.window(start_date, end_date)
+        total_records = summary['records']
+        total_exporters = summary['수출자']
+        total_loading_ports = summary['선적항']
+        total_countries = summary['도착지국가']
+        total_arrival_ports = summary['도착항']
+        total_containers = summary['containers']
 
     col1, col2, col3, col4, col5, col6 = st.columns(6)
 
@@ -194,68 +528,54 @@ def show_data_overview(df, start_date=None, end_date=None):
         unsafe_allow_html=True,
     )
 
+    # 지역별 컨테이너 비중 (지역 x 일 누적합에서 조회)
+    region_totals = sorted(summary['regions'].items(), key=lambda item: -item[1])
+    if region_totals:
+        st.markdown("🗺️ " + " · ".join(
+            f"{region} **{containers / total_containers * 100:.1f}%**" for region, containers in region_totals))
+
     st.write("")    
     st.image("pepe5.png", width=700)
 
 
-def filter_data(df, start_date, end_date, loading_port, arrival_port, arrival_country, min_containers):
-    df = df[(df['선적일'] >= pd.to_datetime(start_date)) & (df['선적일'] <= pd.to_datetime(end_date))]
-
-    if loading_port != 'All':
-        df = df[df['선적항'] == loading_port]
-    if arrival_country != 'All':
-        df = df[df['도착지국가'] == arrival_country]
-    if arrival_port != 'All':
-        df = df[df['도착항'] == arrival_port]
+def show_chunk_overview(backend):
+    # 디스크 청크 모드: manifest 의 기간/행 수만 표시 (청크를 읽지 않음)
+    start_date, end_date = backend.date_range()
+    start_str = start_date.strftime("%Y-%m-%d") if pd.notna(start_date) else "-"
+    end_str = end_date.strftime("%Y-%m-%d") if pd.notna(end_date) else "-"
 
-    grouped = df.groupby('수출자').agg({'컨테이너수': 'sum'}).reset_index()
-    grouped = grouped[grouped['컨테이너수'] >= min_containers]
-    filtered_df = df[df['수출자'].isin(grouped['수출자'])]
+    st.markdown(f"✅ **분석 데이터 개요 ({start_str} ~ {end_str})**")
+    st.markdown(
+        """
+        <div style='text-align: center;'>
+            📄 <b>선적 건</b><br>
+            <span style='font-size: 20px;'>{:,}</span>
+        </div>
+        """.format(backend.store.manifest['rows']),
+        unsafe_allow_html=True,
+    )
+    show_out_of_core_notice("수출자/항구/국가 수 개요")
 
-    return filtered_df
+    st.write("")
+    st.image("pepe5.png", width=700)
 
 
 def generate_exporter_report(수출자, df):
-    exporter_data = df[df['수출자'] == 수출자]
-
-    if exporter_data.empty:
-        return "해당 수출자에 대한 데이터가 없습니다."
-
-    total_containers = exporter_data['컨테이너수'].sum()
-    main_routes = exporter_data.groupby('도착항')['컨테이너수'].sum().sort_values(ascending=False).head(5)
-    main_country = exporter_data.groupby('도착지국가')['컨테이너수'].sum().sort_values(ascending=False).head(5)
-
-    prompt = f"""
-    다음 데이터를 기반으로 '{수출자}'에 대한 컨테이너 수출 분석 보고서를 작성해 주세요:
-    국제물류 포워더로서 해당 수출자에게 컨테이너 물류 영업을 해야 합니다.
-    보고서 내용은 기업 개요, 컨테이너 수출 현황, 물류 영업 전략, 컨테이너 선사 협력 전략 네 부분으로 나눠서 작성해야 합니다.
-    기업 개요는 주요 사업이나 제품에 대해서 간단하게 설명해주세요.
-
-    - 컨테이너 선적 기간: {exporter_data['선적일'].min().date()} ~ {exporter_data['선적일'].max().date()}
-    - 총 수출한 컨테이너 수: {total_containers}
-    - 선적항별 컨테이너 수: {exporter_data.groupby('선적항')['컨테이너수'].sum().to_dict()}
-    - 컨테이너 수출 국가: {exporter_data['도착지국가'].unique().tolist()}
-    - 컨테이너 수출 상위 5개 도착지국가: {main_country}
-    - 컨테이너 수출 상위 5개 도착항: {main_routes}
-    - 컨테이너 부킹 상위 5개 컨테이너 선사: {exporter_data.groupby('컨테이너선사')['컨테이너수'].sum().sort_values(ascending=False).head(5).to_dict()}
-
-    컨테이너 대수는 TEU나 개수로 표현하지 말고, '대수'로 표현해 주세요.
-    선적 기간을 반드시 명시하세요.
-    컨테이너 수출 국가는 아시아, 유럽, 아프리카, 북미, 남미, 오세아니아 등으로 구분해 주세요.
-    물류 영업 전략은 수출자의 주요한 도착지국가와 도착항을 바탕으로 타겟국가, 타겟항구 대상 영업을 확대 제안해주세요 
-    컨테이너 선사 협력 전략은 어떤 컨테이너 선사와 협력하는 것이 좋을지 컨테이너 부킹 선사를 바탕으로 제안해주세요.
-    """
-
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are an assistant that generates export container analysis reports."},
-            {"role": "user", "content": prompt},
-        ],
-    )
+    # 프롬프트는 배치 작업(python reports.py)과 공용
+    prompt = reports.build_report_prompt(수출자, df)
+    if prompt is None:
+        return None, None
+
+    start = time.perf_counter()
+    with metrics.span("llm.exporter_report"):
+        response = client.chat.completions.create(
+            model=reports.REPORT_MODEL,
+            messages=reports.report_messages(prompt),
+        )
+    metrics.record_llm_usage("exporter_report", response, time.perf_counter() - start)
 
     content = response.choices[0].message.content
-    return content
+    return content, reports.usage_dict(response)
 
 
 def classify_actual_shippers(exporter_list):
@@ -273,13 +593,16 @@ def classify_actual_shippers(exporter_list):
     형식: ["화주A", "화주B", ...]
     """
 
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant for analyzing export companies."},
-            {"role": "user", "content": prompt},
-        ],
-    )
+    start = time.perf_counter()
+    with metrics.span("llm.classify_shippers"):
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant for analyzing export companies."},
+                {"role": "user", "content": prompt},
+            ],
+        )
+    metrics.record_llm_usage("classify_shippers", response, time.perf_counter() - start)
 
     content = response.choices[0].message.content.strip()
     return json.loads(content)
@@ -299,6 +622,7 @@ def reset_to_home():
     st.session_state.exporters = []
     st.session_state.start_date = None
     st.session_state.end_date = None
+    st.session_state.region = 'All'
     st.session_state.loading_port = 'All'
     st.session_state.arrival_country = 'All'
     st.session_state.arrival_port = 'All'
@@ -307,8 +631,9 @@ def reset_to_home():
 
     # 사이드바 조건들 초기화
     for key in [
-        'start_date', 'end_date', 'loading_port', 'arrival_country',
-        'arrival_port', 'min_containers', 'exporters',
+        'start_date', 'end_date', 'region', 'loading_port', 'arrival_country',
+        'arrival_port', 'min_containers', 'exporters', 'exporter_query',
+        'search_conditions',
     ]:
         if key in st.session_state:
             del st.session_state[key]
@@ -320,199 +645,96 @@ def reset_to_home():
 #  - 인증 전: show_login() -> st.stop()
 # =======================================
 
-def app():
-    # 쿼리 파라미터에 home 있으면 홈 초기화
-    if "home" in st.query_params:
-        reset_to_home()
-
-    # 인증 확인 (여기서는 새 로그인 UI를 만들지 않음)
-    if not st.session_state.get('authorized', False):
-        show_login()  # 방어적 호출
-
-    # ---- 여기부터 대시보드 ----
-    if not st.session_state.get('has_search_results', False) and not st.session_state.get('has_analysis_results', False):
-        st.header("Data & AI 활용 국내 수출 컨테이너 고객 분석")
-        st.markdown("<hr style='margin-top: 10px; margin-bottom: 10px;'>", unsafe_allow_html=True)
-
-    with st.spinner("⏳ 조금만 기다려주세요. 데이터 로딩 중입니다. (1분 정도 소요됩니다)"):
-        df = load_data()
-    if df is None:
-        return
-
-    # 세션 키 기본값 설정
-    for key, val in {
-        'has_search_results': False,
-        'has_analysis_results': False,
-        'analysis_data': None,
-    }.items():
-        if key not in st.session_state:
-            st.session_state[key] = val
-
-    min_date = df['선적일'].min()
-    max_date = df['선적일'].max()
+# =======================================
+# 화면 구역 (fragment)
+#  - 각 구역의 위젯 변경 시 해당 구역만 다시 실행
+#  - 고객 검색 / 고객 분석 / 홈 버튼을 눌렀을 때만 전체 화면 재실행
+# =======================================
 
-    default_keys = {
-        'start_date': min_date,
-        'end_date': max_date,
-        'loading_port': 'All',
-        'arrival_country': 'All',
-        'arrival_port': 'All',
-        'min_containers': 0,
-        'exporters': [],
-    }
-    for key, val in default_keys.items():
-        if key not in st.session_state:
-            st.session_state[key] = val
+@st.fragment
+def sidebar_filters(df, data_version, backend):
+    options = get_filter_options(data_version, df, backend)
+    min_date = options['min_date']
+    max_date = options['max_date']
 
-    with st.sidebar:
-            # ✅ 2. 사이드바: 제목 + 홈 버튼을 한 줄에 배치
+    # ✅ 2. 사이드바: 제목 + 홈 버튼을 한 줄에 배치
+    col1, col2 = st.columns([2.8, 1])  # 비율 조정 가능
+    with col1:
+        st.subheader("🚩 고객 조건 검색")            
+    with col2:
+        if st.button("🏠", key="home_button"):
+            reset_to_home()
+            st.rerun()
+    st.markdown(
+              "<p style='font-size:14px; color: black; margin-top: 0px; margin-bottom: 6px;'>📅 기간</p>",
+                unsafe_allow_html=True
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        st.session_state.start_date = st.date_input("시작", min_value=min_date, max_value=max_date, value=st.session_state.start_date, label_visibility="collapsed")
+    with col2:
+        st.session_state.end_date = st.date_input("종료", min_value=min_date, max_value=max_date, value=st.session_state.end_date, label_visibility="collapsed")
     
-        col1, col2 = st.columns([2.8, 1])  # 비율 조정 가능
-        with col1:
-            st.subheader("🚩 고객 조건 검색")            
-        with col2:
-            if st.button("🏠", key="home_button"):
-                reset_to_home()
-                st.rerun()
-        st.markdown(
-                  "<p style='font-size:14px; color: black; margin-top: 0px; margin-bottom: 6px;'>📅 기간</p>",
-                    unsafe_allow_html=True
-        )
-        col1, col2 = st.columns(2)
-        with col1:
-            st.session_state.start_date = st.date_input("시작", min_value=min_date, max_value=max_date, value=st.session_state.start_date, label_visibility="collapsed")
-        with col2:
-            st.session_state.end_date = st.date_input("종료", min_value=min_date, max_value=max_date, value=st.session_state.end_date, label_visibility="collapsed")
-        
 
 
-    loading_port_options = ['All'] + sorted(df['선적항'].dropna().astype(str).unique().tolist())
+    loading_port_options = options['loading_ports']
     loading_port_index = loading_port_options.index(st.session_state.loading_port) if st.session_state.loading_port in loading_port_options else 0
-    st.session_state.loading_port = st.sidebar.selectbox("⚓ 선적항", loading_port_options, index=loading_port_index)
+    st.session_state.loading_port = st.selectbox("⚓ 선적항", loading_port_options, index=loading_port_index)
 
-    arrival_country_options = ['All'] + sorted(df['도착지국가'].dropna().astype(str).unique().tolist())
+    region_options = options['regions']
+    region_index = region_options.index(st.session_state.region) if st.session_state.region in region_options else 0
+    st.session_state.region = st.selectbox("🗺️ 지역", region_options, index=region_index)
+
+    if st.session_state.region != 'All':
+        arrival_country_options = options['countries_by_region'].get(st.session_state.region, ['All'])
+    else:
+        arrival_country_options = options['arrival_countries']
     arrival_country_index = arrival_country_options.index(st.session_state.arrival_country) if st.session_state.arrival_country in arrival_country_options else 0
-    st.session_state.arrival_country = st.sidebar.selectbox("🌎 도착지국가", arrival_country_options, index=arrival_country_index)
+    st.session_state.arrival_country = st.selectbox("🌎 도착지국가", arrival_country_options, index=arrival_country_index)
 
-    arrival_port_raw = df[df['도착지국가'] == st.session_state.arrival_country]['도착항'].dropna() if st.session_state.arrival_country != 'All' else df['도착항'].dropna()
-    arrival_port_options = ['All'] + sorted(arrival_port_raw.astype(str).unique().tolist())
+    if st.session_state.arrival_country != 'All':
+        arrival_port_options = options['ports_by_country'].get(st.session_state.arrival_country, ['All'])
+    else:
+        arrival_port_options = options['arrival_ports']
     arrival_port_index = arrival_port_options.index(st.session_state.arrival_port) if st.session_state.arrival_port in arrival_port_options else 0
-    st.session_state.arrival_port = st.sidebar.selectbox("⚓ 도착항", arrival_port_options, index=arrival_port_index)
+    st.session_state.arrival_port = st.selectbox("⚓ 도착항", arrival_port_options, index=arrival_port_index)
 
     container_values = [0, 10, 50, 100, 500, 1000, 5000, 10000]
     container_index = container_values.index(st.session_state.min_containers) if st.session_state.min_containers in container_values else 0
-    st.session_state.min_containers = st.sidebar.selectbox("📦 최소 컨테이너 수", container_values, index=container_index)
-
-    if st.sidebar.button("고객 검색", use_container_width=True):
+    st.session_state.min_containers = st.selectbox("📦 최소 컨테이너 수", container_values, index=container_index)
+
+    if st.button("고객 검색", use_container_width=True):
+        # 검색 결과 화면은 버튼을 누른 시점의 조건만 사용 (이후 위젯 변경은 사이드바만 다시 실행)
+        st.session_state.search_conditions = {
+            'start_date': st.session_state.start_date,
+            'end_date': st.session_state.end_date,
+            'loading_port': st.session_state.loading_port,
+            'arrival_port': st.session_state.arrival_port,
+            'arrival_country': st.session_state.arrival_country,
+            'min_containers': st.session_state.min_containers,
+            'region': st.session_state.region,
+        }
         st.session_state.has_search_results = True
         st.session_state.has_analysis_results = False  # 검색할 때는 분석 결과 숨김3
         st.session_state.analysis_data = None
         st.session_state.show_similar_customers = False
         st.rerun()  # 즉시 페이지 새로고침하여 헤더 숨김
         
-    # 고객 검색 결과 표시
-    if st.session_state.has_search_results:
-
-        # ✅ 검색 조건 요약 표시
-        start_str = st.session_state.start_date.strftime('%Y-%m-%d')
-        end_str = st.session_state.end_date.strftime('%Y-%m-%d')
-        st.subheader(f"📊 조건 검색 결과 ({start_str} ~ {end_str})")
-        st.markdown(
-          "<hr style='margin-top: 10px; margin-bottom: 10px;'>",
-               unsafe_allow_html=True
-                    )
-        st.markdown("🚩 **조건 정보**")
-        st.markdown("""
-        <div style='display: flex; justify-content: space-around; text-align: center;'>
-            <div>
-                <strong>⚓ 선적항</strong><br>
-                <span style='font-size:16px;'>{loading_port}</span>
-            </div>
-            <div>
-                <strong>🌎 도착지국가</strong><br>
-                <span style='font-size:16px;'>{arrival_country}</span>
-            </div>
-            <div>
-                <strong>⚓ 도착항</strong><br>
-                <span style='font-size:16px;'>{arrival_port}</span>
-            </div>
-            <div>
-                <strong>📦 최소 컨테이너 수</strong><br>
-                <span style='font-size:16px;'>{min_containers:,}</span>
-            </div>
-        </div>
-        """.format(
-            loading_port=st.session_state.loading_port,
-            arrival_country=st.session_state.arrival_country,
-            arrival_port=st.session_state.arrival_port,
-            min_containers=st.session_state.min_containers
-        ), unsafe_allow_html=True)
-
-        st.markdown(
-          "<hr style='margin-top: 10px; margin-bottom: 10px;'>",
-               unsafe_allow_html=True
-                    )
-        
-        with st.spinner("⌛ 조건 기반 데이터를 조회 중입니다..."):
-            result_df = filter_data(
-                df,
-                st.session_state.start_date,
-                st.session_state.end_date,
-                st.session_state.loading_port,
-                st.session_state.arrival_port,
-                st.session_state.arrival_country,
-                st.session_state.min_containers
-            )
-            if not result_df.empty:
-                grouped = result_df.groupby('수출자').agg({'컨테이너수': 'sum'}).reset_index()
-                grouped = grouped.sort_values(by='컨테이너수', ascending=False)
-                grouped['순위'] = grouped['컨테이너수'].rank(ascending=False, method='min')
-                grouped = grouped[['순위', '수출자', '컨테이너수']].reset_index(drop=True)
-                total_customers = len(grouped)  # 총 고객 수 계산
-                
-                if 'show_actual_shippers' not in st.session_state:
-                   st.session_state.show_actual_shippers = False
-                
-                st.write("✅ **고객 리스트**")
-                with st.expander(f"🔍 총 **{total_customers}**개 고객 확인", expanded=False):
-                     st.write("", grouped)
-                        # ▶ 버튼 클릭 시 GPT 요청하도록 구성
-                     if st.button("✨ AI 실화주 확인", key="check_actual_shippers"):
-                        with st.spinner("AI를 통해 실화주 분류 중입니다."):
-                            exporters_list = grouped['수출자'].tolist()
-                            actual_shippers = classify_actual_shippers(exporters_list)
-                    
-                        if actual_shippers:
-                            actual_df = grouped[grouped['수출자'].isin(actual_shippers)].copy()
-                            num_actual = len(actual_df)
-                            st.success(f"AI를 통해 {num_actual}개의 실화주 고객이 확인되었습니다.")
-                            st.dataframe(actual_df)
-                        else:
-                            st.warning("다시 한 번 시도해주세요.")
-
-                port_grouped = result_df.groupby('컨테이너선사').agg({'컨테이너수': 'sum'}).reset_index()                
-                port_grouped = port_grouped.sort_values(by='컨테이너수', ascending=False)
-                port_grouped['순위'] = port_grouped['컨테이너수'].rank(ascending=False, method='min')
-                port_grouped = port_grouped[['순위', '컨테이너선사', '컨테이너수']].reset_index(drop=True)
-                total_lines = len(port_grouped)
-                st.write("✅ **컨테이너선사 정보**")
-                with st.expander(f"🔍 총 **{total_lines}**개 선사 확인", expanded=False):
-                    st.write("", port_grouped)
-
-            else:
-                st.warning("조건에 맞는 데이터가 없습니다.")
-
-    
-
-    # 수출자 목록 불러오기 + placeholder 추가
-    all_exporters = sorted(df['수출자'].dropna().astype(str).unique().tolist())
-    exporter_options = ["Company Name"] + all_exporters
+    # 수출자 자동완성: 입력한 검색어의 상위 매칭만 selectbox 에 표시
+    exporter_index = cached_call("exporter_index", get_exporter_index, data_version, df, backend)
+    exporter_query = st.text_input("📌 **고객 상세 검색**", placeholder="Company Name", key="exporter_query")
+    with metrics.span("ui.exporter_search"):
+        matches = exporter_index.search(exporter_query, limit=EXPORTER_SEARCH_LIMIT)
 
     # 이전 선택 상태 불러오기 (있다면 유지)
-    default_exporter = st.session_state.exporters[0] if st.session_state.get("exporters") else exporter_options[0]
+    previous = st.session_state.exporters[0] if st.session_state.get("exporters") else None
+    if previous and previous not in matches:
+        matches = [previous] + matches
+    exporter_options = ["Company Name"] + matches
+    default_exporter = previous if previous else exporter_options[0]
 
     # selectbox 표시
-    selected_exporter = st.sidebar.selectbox("📌 **고객 상세 검색**", exporter_options, index=exporter_options.index(default_exporter))
+    selected_exporter = st.selectbox("고객 선택", exporter_options, index=exporter_options.index(default_exporter), label_visibility="collapsed")
 
     # 선택된 값이 유효할 때만 session_state에 저장
     if selected_exporter != "Company Name":
@@ -520,20 +742,21 @@ def app():
     else:
         st.session_state.exporters = []
     
-    if st.sidebar.button("고객 분석", use_container_width=True):
+    if st.button("고객 분석", use_container_width=True):
      if st.session_state.exporters:
         st.session_state.has_analysis_results = True
         st.session_state.has_search_results = False
 
         # 👉 분석 데이터 준비
-        date_filtered_df = df[(df['선적일'] >= pd.to_datetime(st.session_state.start_date)) &
-                              (df['선적일'] <= pd.to_datetime(st.session_state.end_date))]
-        filtered = date_filtered_df[date_filtered_df['수출자'].isin(st.session_state.exporters)]
+        with metrics.span("analysis.filter"):
+            filtered = backend.exporter_rows(st.session_state.exporters,
+                                             st.session_state.start_date, st.session_state.end_date)
 
         if not filtered.empty:
             st.session_state.analysis_data = {
                 'filtered': filtered,
-                'exporters': st.session_state.exporters.copy()
+                'exporters': st.session_state.exporters.copy(),
+                'period': (st.session_state.start_date, st.session_state.end_date),
             }
         else:
             st.session_state.analysis_data = None
@@ -543,385 +766,557 @@ def app():
         st.rerun()
      else:
         st.warning("수출자를 한 명 이상 선택해 주세요.")
-    with st.sidebar:
-     
-     st.markdown(
-        "<div style='font-size:11px; text-align:center; color:gray;'>ⓒ 2025 Sehyuk Han</div>",
-        unsafe_allow_html=True
-    )
-    
-    # 분석 결과 표시 (세션 상태 기반)
-    if st.session_state.has_analysis_results and st.session_state.analysis_data:
-        filtered = st.session_state.analysis_data['filtered']
-        selected_exporters = st.session_state.analysis_data['exporters']
 
-        start_str = st.session_state.start_date.strftime("%Y-%m-%d")
-        end_str = st.session_state.end_date.strftime("%Y-%m-%d")
-        selected_exporter_str = ", ".join(selected_exporters)
+@st.fragment
+def show_search_results(df, data_version, backend):
+    conditions = st.session_state.search_conditions
+
+    # ✅ 검색 조건 요약 표시
+    start_str = conditions['start_date'].strftime('%Y-%m-%d')
+    end_str = conditions['end_date'].strftime('%Y-%m-%d')
+    st.subheader(f"📊 조건 검색 결과 ({start_str} ~ {end_str})")
+    st.markdown(
+      "<hr style='margin-top: 10px; margin-bottom: 10px;'>",
+           unsafe_allow_html=True
+                )
+    st.markdown("🚩 **조건 정보**")
+    st.markdown("""
+    <div style='display: flex; justify-content: space-around; text-align: center;'>
+        <div>
+            <strong>🗺️ 지역</strong><br>
+            <span style='font-size:16px;'>{region}</span>
+        </div>
+        <div>
+            <strong>⚓ 선적항</strong><br>
+            <span style='font-size:16px;'>{loading_port}</span>
+        </div>
+        <div>
+            <strong>🌎 도착지국가</strong><br>
+            <span style='font-size:16px;'>{arrival_country}</span>
+        </div>
+        <div>
+            <strong>⚓ 도착항</strong><br>
+            <span style='font-size:16px;'>{arrival_port}</span>
+        </div>
+        <div>
+            <strong>📦 최소 컨테이너 수</strong><br>
+            <span style='font-size:16px;'>{min_containers:,}</span>
+        </div>
+    </div>
+    """.format(
+        region=conditions['region'],
+        loading_port=conditions['loading_port'],
+        arrival_country=conditions['arrival_country'],
+        arrival_port=conditions['arrival_port'],
+        min_containers=conditions['min_containers']
+    ), unsafe_allow_html=True)
 
-        st.subheader(f"📈 {selected_exporter_str} 결과 ({start_str} ~ {end_str}) ")
-        st.markdown(
-          "<hr style='margin-top: 5px; margin-bottom: 10px;'>",
-               unsafe_allow_html=True
+    st.markdown(
+      "<hr style='margin-top: 10px; margin-bottom: 10px;'>",
+           unsafe_allow_html=True
+                )
+    
+    with st.spinner("⌛ 조건 기반 데이터를 조회 중입니다..."):
+        grouped, port_grouped, monthly, region_rollup = cached_call(
+            "search_rankings", get_search_rankings, data_version, backend.name, conditions, backend)
+        if not grouped.empty:
+            total_customers = len(grouped)  # 총 고객 수 계산
+            
+            if 'show_actual_shippers' not in st.session_state:
+               st.session_state.show_actual_shippers = False
+            
+            st.write("✅ **고객 리스트**")
+            with st.expander(f"🔍 총 **{total_customers}**개 고객 확인", expanded=False):
+                 st.write("", grouped)
+                    # ▶ 버튼 클릭 시 GPT 요청하도록 구성
+                 if st.button("✨ AI 실화주 확인", key="check_actual_shippers"):
+                    with st.spinner("AI를 통해 실화주 분류 중입니다."):
+                        exporters_list = grouped['수출자'].tolist()
+                        actual_shippers = classify_actual_shippers(exporters_list)
+                
+                    if actual_shippers:
+                        actual_df = grouped[grouped['수출자'].isin(actual_shippers)].copy()
+                        num_actual = len(actual_df)
+                        st.success(f"AI를 통해 {num_actual}개의 실화주 고객이 확인되었습니다.")
+                        st.dataframe(actual_df)
+                    else:
+                        st.warning("다시 한 번 시도해주세요.")
+
+            total_lines = len(port_grouped)
+            st.write("✅ **컨테이너선사 정보**")
+            with st.expander(f"🔍 총 **{total_lines}**개 선사 확인", expanded=False):
+                st.write("", port_grouped)
+
+            st.write("🗺️ **지역별 컨테이너**")
+            with st.expander(f"🔍 {len(region_rollup)}개 지역 확인", expanded=False):
+                st.dataframe(region_rollup, hide_index=True)
+                st.bar_chart(region_rollup.set_index(regions.REGION_COLUMN)['컨테이너수'])
+
+            st.write("📅 **월별 컨테이너 추이**")
+            with st.expander("🔍 조건 검색 월별 컨테이너 수 확인", expanded=False):
+                st.line_chart(monthly.set_index('월')['컨테이너수'])
+
+            st.write("🧑 **수입자 역검색**")
+            with st.expander("🔍 수입자로 수출자 찾기", expanded=False):
+                if df is None:
+                    show_out_of_core_notice("수입자 역검색")
+                else:
+                    show_importer_lookup(*cached_call("importer_network", get_importer_network, data_version, df))
+
+            st.write("🚢 **선사 시장 점유율**")
+            with st.expander("🔍 선사 x 시장 점유율 확인", expanded=False):
+                if df is None:
+                    show_out_of_core_notice("선사 시장 점유율")
+                else:
+                    show_market_share(cached_call("market_matrices", get_market_matrices, data_version, df), conditions)
+
+            st.write("📈 **성장 고객 순위**")
+            with st.expander(f"🔍 최근 {leaderboard.LEADERBOARD_MONTHS}개월 성장/모멘텀 확인", expanded=False):
+                if df is None:
+                    show_out_of_core_notice("성장 고객 순위")
+                else:
+                    board = cached_call(
+                        "growth_leaderboard", get_growth_leaderboard, data_version,
+                        conditions['loading_port'], conditions['arrival_country'],
+                        conditions['arrival_port'], conditions['region'], df,
                     )
-        st.markdown("✅ **요약 정보**")
+                    sort_by = st.selectbox("정렬 기준", ['성장률(%)', '추세(%/월)', '추세(대/월)', '기간 컨테이너수', '변동성(CV)'], key="growth_sort")
+                    board = board[board['기간 컨테이너수'] >= conditions['min_containers']]
+                    board = board.sort_values(sort_by, ascending=False, na_position='last').reset_index(drop=True)
+                    st.dataframe(board)
 
-        total_records = len(filtered)
-        total_loading_ports = filtered['선적항'].nunique()
-        total_countries = filtered['도착지국가'].nunique()
-        total_arrival_ports = filtered['도착항'].nunique()
-        total_containers = filtered['컨테이너수'].sum()
-        total_container_lines = filtered['컨테이너선사'].nunique()
+            st.write("🧠 **시장 예측**")
+            with st.expander("🔍 **향후 3개월 시장 예측 확인**", expanded=False):
+                show_market_forecasts(data_version, conditions)
 
-        col1, col2, col3, col4, col5, col6 = st.columns(6)        
-        col1.markdown("""
-        <div style='text-align: center;'>
-            📄 <b>선적 건</b><br>
-            <span style='font-size: 20px;'>{:,}</span>
-        </div>
-        """.format(total_records), unsafe_allow_html=True)
+        else:
+            st.warning("조건에 맞는 데이터가 없습니다.")
 
-        col2.markdown("""
-        <div style='text-align: center;'>
-            📦 <b>컨테이너</b><br>
-            <span style='font-size: 20px;'>{:,}</span>
-        </div>
-        """.format(total_containers), unsafe_allow_html=True)
 
-        col3.markdown("""
-        <div style='text-align: center;'>
-            🚢 <b>부킹 선사</b><br>
-            <span style='font-size: 20px;'>{}</span>
-        </div>
-        """.format(total_container_lines), unsafe_allow_html=True)
 
-        col4.markdown("""
-        <div style='text-align: center;'>
-            ⚓ <b>선적항</b><br>
-            <span style='font-size: 20px;'>{}</span>
-        </div>
-        """.format(total_loading_ports), unsafe_allow_html=True)
 
-        col5.markdown("""
-        <div style='text-align: center;'>
-            🌍 <b>도착지국가</b><br>
-            <span style='font-size: 20px;'>{}</span>
-        </div>
-        """.format(total_countries), unsafe_allow_html=True)
+@st.fragment
+def show_analysis_results(df, data_version, backend):
+    filtered = st.session_state.analysis_data['filtered']
+    selected_exporters = st.session_state.analysis_data['exporters']
+    analysis_start, analysis_end = st.session_state.analysis_data['period']
 
-        col6.markdown("""
-        <div style='text-align: center;'>
-            ⚓ <b>도착항</b><br>
-            <span style='font-size: 20px;'>{}</span>
-        </div>
-        """.format(total_arrival_ports), unsafe_allow_html=True)
-        st.markdown("")
-        
-        # [1] 도착지국가별 컨테이너 수 합계
-        arrival_country_sum = filtered.groupby('도착지국가').agg({'컨테이너수': 'sum'}).reset_index()
-        arrival_country_sum = arrival_country_sum.sort_values(by='컨테이너수', ascending=False).reset_index(drop=True)
+    start_str = analysis_start.strftime("%Y-%m-%d")
+    end_str = analysis_end.strftime("%Y-%m-%d")
+    selected_exporter_str = ", ".join(selected_exporters)
 
-        # ▶ 비중(%) 계산 추가
-        total_containers = arrival_country_sum['컨테이너수'].sum()
-        arrival_country_sum['비중(%)'] = (arrival_country_sum['컨테이너수'] / total_containers * 100).round(1)
+    st.subheader(f"📈 {selected_exporter_str} 결과 ({start_str} ~ {end_str}) ")
+    st.markdown(
+      "<hr style='margin-top: 5px; margin-bottom: 10px;'>",
+           unsafe_allow_html=True
+                )
+    st.markdown("✅ **요약 정보**")
+
+    summary = qe.customer_summary(filtered)
+    total_records = summary['records']
+    total_loading_ports = summary['loading_ports']
+    total_countries = summary['countries']
+    total_arrival_ports = summary['arrival_ports']
+    total_containers = summary['containers']
+    total_container_lines = summary['container_lines']
+
+    col1, col2, col3, col4, col5, col6 = st.columns(6)        
+    col1.markdown("""
+    <div style='text-align: center;'>
+        📄 <b>선적 건</b><br>
+        <span style='font-size: 20px;'>{:,}</span>
+    </div>
+    """.format(total_records), unsafe_allow_html=True)
+
+    col2.markdown("""
+    <div style='text-align: center;'>
+        📦 <b>컨테이너</b><br>
+        <span style='font-size: 20px;'>{:,}</span>
+    </div>
+    """.format(total_containers), unsafe_allow_html=True)
+
+    col3.markdown("""
+    <div style='text-align: center;'>
+        🚢 <b>부킹 선사</b><br>
+        <span style='font-size: 20px;'>{}</span>
+    </div>
+    """.format(total_container_lines), unsafe_allow_html=True)
+
+    col4.markdown("""
+    <div style='text-align: center;'>
+        ⚓ <b>선적항</b><br>
+        <span style='font-size: 20px;'>{}</span>
+    </div>
+    """.format(total_loading_ports), unsafe_allow_html=True)
+
+    col5.markdown("""
+    <div style='text-align: center;'>
+        🌍 <b>도착지국가</b><br>
+        <span style='font-size: 20px;'>{}</span>
+    </div>
+    """.format(total_countries), unsafe_allow_html=True)
+
+    col6.markdown("""
+    <div style='text-align: center;'>
+        ⚓ <b>도착항</b><br>
+        <span style='font-size: 20px;'>{}</span>
+    </div>
+    """.format(total_arrival_ports), unsafe_allow_html=True)
+    st.markdown("")
+    
+    # [1] 도착지국가별 컨테이너 수 합계
+    with metrics.span("analysis.country_share"):
+        arrival_country_sum = backend.country_share(selected_exporters, analysis_start, analysis_end)
 
-        st.markdown("✅ **상세 정보**")
+    st.markdown("✅ **상세 정보**")
 
-        with st.expander("🔍 **상세 정보 확인**", expanded=False):
-            st.markdown("🌍 **도착지국가**")
-            st.dataframe(arrival_country_sum)
+    with st.expander("🔍 **상세 정보 확인**", expanded=False):
+        st.markdown("🗺️ **지역**")
+        st.dataframe(qe.region_share(filtered), hide_index=True)
 
+        st.markdown("🌍 **도착지국가**")
+        st.dataframe(arrival_country_sum)
 
-            grouped_exporter = filtered.groupby(['수출자', '선적항', '도착지국가', '도착항']).agg({'컨테이너수': 'sum'}).reset_index()
-            grouped_exporter = grouped_exporter.sort_values(by='컨테이너수', ascending=False).reset_index(drop=True)
 
-            total_sum = grouped_exporter['컨테이너수'].sum()
-            total_row = pd.DataFrame([{
-                '수출자': '총합계',
-                '선적항': '',
-                '도착지국가': '',
-                '도착항': '',
-                '컨테이너수': total_sum
-            }])
-            grouped_exporter = pd.concat([grouped_exporter, total_row], ignore_index=True)
-            
-            st.markdown("⚓ **선적항-도착지국가-도착항**")
-            st.dataframe(grouped_exporter)
-
-            # [2] 도착지국가별 컨테이너선사별 컨테이너 수 및 비중
-            grouped_by_country_line = filtered.groupby(['도착지국가', '컨테이너선사']).agg({'컨테이너수': 'sum'}).reset_index()
-            total_per_country = grouped_by_country_line.groupby('도착지국가')['컨테이너수'].transform('sum')
-            grouped_by_country_line['비중(%)'] = (grouped_by_country_line['컨테이너수'] / total_per_country * 100).round(1)
-            grouped_by_country_line = grouped_by_country_line.sort_values(by=['도착지국가', '컨테이너수'], ascending=[True, False]).reset_index(drop=True)
-            
-            
-            st.markdown("🚢 **도착지국가-컨테이너선사**")
-            st.dataframe(grouped_by_country_line)
+        with metrics.span("analysis.route_breakdown"):
+            grouped_exporter = qe.append_total_row(
+                backend.route_breakdown(selected_exporters, analysis_start, analysis_end))
+        
+        st.markdown("⚓ **선적항-도착지국가-도착항**")
+        st.dataframe(grouped_exporter)
 
+        # [2] 도착지국가별 컨테이너선사별 컨테이너 수 및 비중
+        with metrics.span("analysis.country_carrier"):
+            grouped_by_country_line = backend.country_carrier_share(selected_exporters, analysis_start, analysis_end)
+        
+        
+        st.markdown("🚢 **도착지국가-컨테이너선사**")
+        st.dataframe(grouped_by_country_line)
 
 
-            arrival_importer_df = (
-                filtered.groupby(['도착지국가', '수입자'])
-                .agg({'컨테이너수': 'sum'})
-                .reset_index()
-                .sort_values(['도착지국가', '컨테이너수'], ascending=[True, False])
-            )
 
-            st.markdown("🧑 **도착지국가-수입자**")
-            st.dataframe(arrival_importer_df)
+        with metrics.span("analysis.country_importer"):
+            arrival_importer_df = backend.country_importer(selected_exporters, analysis_start, analysis_end)
 
-        st.markdown("✅ **컨테이너 물동량**")
-        with st.expander("🔍 **월별 추세 확인**", expanded=False):
-            
-            # 월별 컨테이너 수 집계
-            monthly_container_count = filtered.copy()
-            monthly_container_count['월'] = monthly_container_count['선적일'].dt.to_period('M').astype(str)
-            monthly_summary = monthly_container_count.groupby('월')['컨테이너수'].sum().reset_index()
-            monthly_summary = monthly_summary.sort_values(by='월')
-
-            # ✅ 꺾은선 그래프 그리기
-            fig, ax = plt.subplots(figsize=(12, 4))
-            ax.plot(
-                monthly_summary['월'],
-                monthly_summary['컨테이너수'],
-                marker='o',
-                linestyle='-',
-                color="#1A34AC"
-            )
-
-            ax.set_xlabel("", fontsize=12)
-            ax.set_ylabel("", fontsize=12)
-            ax.set_title("", fontsize=12)
-            ax.tick_params(axis='x', rotation=45)
+        st.markdown("🧑 **도착지국가-수입자**")
+        st.dataframe(arrival_importer_df)
 
-            st.pyplot(fig)
+    with st.expander("🤝 **수입자 공유 유사 고객 확인**", expanded=False):
+        if df is None:
+            show_out_of_core_notice("수입자 공유 유사 고객")
+        else:
+            network, _ = cached_call("importer_network", get_importer_network, data_version, df)
+            with metrics.span("importer_network.shared_consignees"):
+                similar = network.shared_consignees(selected_exporters[0])
+            st.caption("같은 수입자에게 선적하는 다른 수출자 (전체 기간 기준, 유사도 = 공유 수입자 Jaccard)")
+            st.dataframe(similar)
+
+    st.markdown("✅ **컨테이너 물동량**")
+    with st.expander("🔍 **월별 추세 확인**", expanded=False):
+        
+        # 월별 컨테이너 수 집계
+        monthly_summary = qe.monthly_containers(filtered)
+
+        # ✅ 꺾은선 그래프 그리기
+        fig, ax = plt.subplots(figsize=(12, 4))
+        ax.plot(
+            monthly_summary['월'],
+            monthly_summary['컨테이너수'],
+            marker='o',
+            linestyle='-',
+            color="#1A34AC"
+        )
 
-        with st.expander("🔍 **도착지국가 월별 추세 확인**", expanded=False):
-            filtered['선적월'] = filtered['선적일'].dt.to_period('M').astype(str)
-
-            # 월별, 도착지국가별 집계
-            monthly_by_country = filtered.groupby(['선적월', '도착지국가'])['컨테이너수'].sum().reset_index()
-
-            # [3] 전체 기간 동안 상위 10개 도착지국가 추출
-            top_10_countries = (
-                filtered.groupby('도착지국가')['컨테이너수']
-                .sum()
-                .sort_values(ascending=False)
-                .head(10)
-                .index.tolist()
-            )
-
-            # [4] 상위 10개 국가만 필터링
-            monthly_top10 = monthly_by_country[monthly_by_country['도착지국가'].isin(top_10_countries)]
-
-            # [5] 피벗 테이블 생성
-            pivot_df = monthly_top10.pivot(index='선적월', columns='도착지국가', values='컨테이너수').fillna(0)
-
-            pivot_df = pivot_df[top_10_countries]
-
-            # [6] 그래프 그리기
-            fig, ax = plt.subplots(figsize=(10, 4))
-            pivot_df.plot(ax=ax, marker='o')
-
-            plt.title("")
-            plt.xlabel("")
-            plt.ylabel("")
-            plt.xticks(rotation=45)
-            plt.legend(
-                title='Top 10',
-                title_fontsize=14,
-                fontsize=13.2,
-                loc='center left',
-                bbox_to_anchor=(1.0, 0.5)  # ▶ 오른쪽 바깥쪽 (x=1.0, y=0.5)
-            )
-            plt.tight_layout()
-
-            # [7] Streamlit에 표시
+        ax.set_xlabel("", fontsize=12)
+        ax.set_ylabel("", fontsize=12)
+        ax.set_title("", fontsize=12)
+        ax.tick_params(axis='x', rotation=45)
+
+        with metrics.span("plot.render"):
             st.pyplot(fig)
 
-        
-        with st.expander("🧠 **향후 3개월 예측 확인**", expanded=False):
-                try:
-                    # ✅ 일자별 컨테이너 수 집계
-                    daily_df = filtered[['선적일', '컨테이너수']].copy()
-                    daily_df = daily_df.groupby('선적일').sum().reset_index()
-                    daily_df = daily_df.rename(columns={'선적일': 'ds', '컨테이너수': 'y'})
-
-                    # ✅ Prophet 모델 학습
-                    model = Prophet()
-                    model.fit(daily_df)
-
-                    # ✅ 향후 3개월 (90일) 예측
-                    future = model.make_future_dataframe(periods=90)
-                    forecast = model.predict(future)
-
-                    # [1] 실제값 월별 집계
-                    actual_df = daily_df.copy()
-                    actual_df['월'] = actual_df['ds'].dt.to_period('M').astype(str)
-                    monthly_actual = actual_df.groupby('월')['y'].sum().reset_index()
-                    monthly_actual = monthly_actual.rename(columns={'y': '실적'})
-
-                    # [2] 예측값 중 미래만 필터
-                    last_actual_date = daily_df['ds'].max()
-                    forecast_future = forecast[forecast['ds'] > last_actual_date].copy()
-                    forecast_future['월'] = forecast_future['ds'].dt.to_period('M').astype(str)
-                    monthly_forecast = forecast_future.groupby('월')['yhat'].sum().reset_index()
-                    monthly_forecast = monthly_forecast.rename(columns={'yhat': '예측'})
-
-                    # ✅ 예측값을 정수로 반올림
-                    monthly_forecast['예측'] = monthly_forecast['예측'].round(0).astype(int)
-                    # [3] 실적 + 예측 결합
-                    combined = pd.merge(monthly_actual, monthly_forecast, on='월', how='outer')
-
-                    # ✅ 예측 구간이 아닌 곳은 예측값 NaN 처리 (시각적으로 깔끔하게 분리됨)
-                    combined['예측'] = combined.apply(
-                        lambda row: row['예측'] if row['월'] in monthly_forecast['월'].values else None,
-                        axis=1
-                    )
+    with st.expander("🔍 **도착지국가 월별 추세 확인**", expanded=False):
+        filtered['선적월'] = filtered['선적일'].dt.to_period('M').astype(str)
 
-                    # ✅ 시각화
-                    fig2, ax2 = plt.subplots(figsize=(10, 4))
+        # 월별, 도착지국가별 집계
+        monthly_by_country = filtered.groupby(['선적월', '도착지국가'])['컨테이너수'].sum().reset_index()
+
+        # [3] 전체 기간 동안 상위 10개 도착지국가 추출
+        top_10_countries = (
+            filtered.groupby('도착지국가')['컨테이너수']
+            .sum()
+            .sort_values(ascending=False)
+            .head(10)
+            .index.tolist()
+        )
 
-                    # 1. 실적: 검정 실선
-                    ax2.plot(combined['월'], combined['실적'], marker='o', label='ACT', color='black', linewidth=1.0)
+        # [4] 상위 10개 국가만 필터링
+        monthly_top10 = monthly_by_country[monthly_by_country['도착지국가'].isin(top_10_countries)]
 
-                    # 2. 예측: 파란 점선
-                    ax2.plot(combined['월'], combined['예측'], marker='o', linestyle='--', label='FCT', color='blue', linewidth=1.0)
+        # [5] 피벗 테이블 생성
+        pivot_df = monthly_top10.pivot(index='선적월', columns='도착지국가', values='컨테이너수').fillna(0)
+
+        pivot_df = pivot_df[top_10_countries]
+
+        # [6] 그래프 그리기
+        fig, ax = plt.subplots(figsize=(10, 4))
+        pivot_df.plot(ax=ax, marker='o')
+
+        plt.title("")
+        plt.xlabel("")
+        plt.ylabel("")
+        plt.xticks(rotation=45)
+        plt.legend(
+            title='Top 10',
+            title_fontsize=14,
+            fontsize=13.2,
+            loc='center left',
+            bbox_to_anchor=(1.0, 0.5)  # ▶ 오른쪽 바깥쪽 (x=1.0, y=0.5)
+        )
+        plt.tight_layout()
 
-                    # ✅ 3. 실적 → 예측 연결선
-                    # 실적 마지막 월과 값
-                    last_actual = combined[combined['실적'].notna()].iloc[-1]
-                    # 예측 첫 번째 월과 값
-                    first_pred = combined[combined['예측'].notna()].iloc[0]
+        # [7] Streamlit에 표시
+        with metrics.span("plot.render"):
+            st.pyplot(fig)
 
-                    # 두 점만 있는 연결선 (점선, 파란색)
-                    ax2.plot(
-                        [last_actual['월'], first_pred['월']],
-                        [last_actual['실적'], first_pred['예측']],
-                        linestyle='--',
-                        linewidth=1.0,
-                        color='blue'
+    
+    with st.expander("🧠 **향후 3개월 예측 확인**", expanded=False):
+            try:
+                # ✅ 일자별 컨테이너 수 집계
+                daily_df = backtesting.daily_series(filtered)
+
+                with metrics.span("prophet.forecast"):
+                    combined = cached_call(
+                        "exporter_forecast", get_exporter_forecast, data_version,
+                        tuple(selected_exporters), (analysis_start, analysis_end), daily_df,
                     )
 
-                    # 스타일 유지
-                    ax2.set_title("")
-                    ax2.set_ylabel("")
-                    ax2.legend()
-                    plt.xticks(rotation=45)
+                # ✅ 시각화
+                fig2, ax2 = plt.subplots(figsize=(10, 4))
+
+                # 1. 실적: 검정 실선
+                ax2.plot(combined['월'], combined['실적'], marker='o', label='ACT', color='black', linewidth=1.0)
+
+                # 2. 예측: 파란 점선
+                ax2.plot(combined['월'], combined['예측'], marker='o', linestyle='--', label='FCT', color='blue', linewidth=1.0)
+
+                # ✅ 3. 실적 → 예측 연결선
+                # 실적 마지막 월과 값
+                last_actual = combined[combined['실적'].notna()].iloc[-1]
+                # 예측 첫 번째 월과 값
+                first_pred = combined[combined['예측'].notna()].iloc[0]
+
+                # 두 점만 있는 연결선 (점선, 파란색)
+                ax2.plot(
+                    [last_actual['월'], first_pred['월']],
+                    [last_actual['실적'], first_pred['예측']],
+                    linestyle='--',
+                    linewidth=1.0,
+                    color='blue'
+                )
+
+                # 스타일 유지
+                ax2.set_title("")
+                ax2.set_ylabel("")
+                ax2.legend()
+                plt.xticks(rotation=45)
+                with metrics.span("plot.render"):
                     st.pyplot(fig2)
 
-                    # ✅ 표 출력
-                    def format_container_value(row):
-                        if not pd.isna(row['실적']):
-                            return f"{int(row['실적']):,}"
-                        elif not pd.isna(row['예측']):
-                            return f"<span style='color:blue'>{int(row['예측']):,}</span>"
-                        else:
-                            return "-"
-
-                    combined['컨테이너 수'] = combined.apply(format_container_value, axis=1)
-
-                    
-                    # ✅ HTML 테이블로 출력 (헤더 줄바꿈 방지 포함)ㄹ
-                    # pivot_table는 이미 아래와 같이 만들어졌다고 가정
-                    pivot_table = combined.set_index('월')[['컨테이너 수']].T
-
-                    # 줄바꿈 제거한 HTML 문자열
-                    styled_table = (
-                        "<style>"
-                        "table {"
-                        "  border-collapse: collapse;"
-                        "}"
-                        "th, td {"
-                        "  border: 1.5px solid #000000;"
-                        "  padding: 3px;"
-                        "  font-size: 12px;"
-                        "  font-weight: normal;"
-                        "  text-align: center;"
-                        "  white-space: nowrap;"
-                        "}"
-                        "</style>"
-                        + pivot_table.to_html(escape=False, border=0)
-                    )
-                    st.markdown(styled_table, unsafe_allow_html=True)
-
-                    # ✅ 최근 30일을 평가용으로 사용
-                    # Prophet은 미래만 예측하므로, 예측 가능한 과거도 포함하여 테스트
-
-                    # Step 1. 최근 30일간 실제값
-                    test_df = daily_df.copy()
-                    test_df = test_df.sort_values('ds').reset_index(drop=True)
-                    test_range = test_df.tail(30)
-                    last_date = test_range['ds'].max()
-
-                    # Step 2. Prophet 학습용 데이터 (최근 30일을 예측 대상으로 제외)
-                    train_df = test_df[test_df['ds'] < test_range['ds'].min()]
-
-                    # Step 3. 모델 재학습
-                    model_eval = Prophet()
-                    model_eval.fit(train_df)
-
-                    # Step 4. 평가용 예측
-                    future_eval = model_eval.make_future_dataframe(periods=30)
-                    forecast_eval = model_eval.predict(future_eval)
-
-                    # Step 5. 예측 결과 중 테스트 날짜만 추출
-                    pred_30 = forecast_eval[forecast_eval['ds'].isin(test_range['ds'])]
-                    y_true = test_range['y'].values
-                    y_pred = pred_30['yhat'].values
-
-                    # Step 6. MAE 계산
-                    mae = mean_absolute_error(y_true, y_pred)
-                    mae_int = int(round(mae, 0))
-
-                    # Step 7. 사용자에게 출력
-                    st.markdown(f"""
-                    <div style="font-size:14px; line-height:1.8; color: blue;">
-                    🧠 <b>예측 모델</b><br>              
-                    </div>
-                    """, unsafe_allow_html=True)   
-
-                    st.markdown(f"""
-                    <div style="font-size:14px; line-height:1.8; margin-left: 20px;">
-                      - 머신러닝 기반 시계열 예측 모델: Prophet (by Meta/Facebook)<br>
-                      - 조건 기간에 포함된 고객 데이터를 학습하여, 향후 3개월 컨테이너 수를 예측합니다.<br>                
-                      - 평균 절대 오차(MAE): {mae_int:,}대 
-                      (최근 30일 실제 데이터 분석 결과, 평균 오차는 약 {mae_int}대입니다.
-                    <br><br>
-                    
-                    </div>
-                    """, unsafe_allow_html=True)       
-                except Exception as e:
-                    st.error(f"예측 분석 중 오류 발생: {e}")
+                # ✅ 표 출력
+                def format_container_value(row):
+                    if not pd.isna(row['실적']):
+                        return f"{int(row['실적']):,}"
+                    elif not pd.isna(row['예측']):
+                        return f"<span style='color:blue'>{int(row['예측']):,}</span>"
+                    else:
+                        return "-"
 
+                combined['컨테이너 수'] = combined.apply(format_container_value, axis=1)
 
+                
+                # ✅ HTML 테이블로 출력 (헤더 줄바꿈 방지 포함)ㄹ
+                # pivot_table는 이미 아래와 같이 만들어졌다고 가정
+                pivot_table = combined.set_index('월')[['컨테이너 수']].T
+
+                # 줄바꿈 제거한 HTML 문자열
+                styled_table = (
+                    "<style>"
+                    "table {"
+                    "  border-collapse: collapse;"
+                    "}"
+                    "th, td {"
+                    "  border: 1.5px solid #000000;"
+                    "  padding: 3px;"
+                    "  font-size: 12px;"
+                    "  font-weight: normal;"
+                    "  text-align: center;"
+                    "  white-space: nowrap;"
+                    "}"
+                    "</style>"
+                    + pivot_table.to_html(escape=False, border=0)
+                )
+                st.markdown(styled_table, unsafe_allow_html=True)
+
+                # ✅ 예측 정확도: 저장된 rolling-origin 백테스트 결과 (전체 기간 기준)
+                #  - 배치: python backtesting.py --top N
+                st.markdown(f"""
+                <div style="font-size:14px; line-height:1.8; color: blue;">
+                🧠 <b>예측 모델</b><br>              
+                </div>
+                """, unsafe_allow_html=True)   
+
+                st.markdown(f"""
+                <div style="font-size:14px; line-height:1.8; margin-left: 20px;">
+                  - 머신러닝 기반 시계열 예측 모델: Prophet (by Meta/Facebook)<br>
+                  - 조건 기간에 포함된 고객 데이터를 학습하여, 향후 3개월 컨테이너 수를 예측합니다.<br>                
+                  - 예측 정확도: 과거 {backtesting.BACKTEST_CUTOFFS}개 시점에서 재학습한 예측과 실제값을 비교한 예측 범위별 평균 오차입니다.
+                <br><br>
+                
+                </div>
+                """, unsafe_allow_html=True)
+
+                backtest = backtesting.exporter_backtest(data_version, selected_exporters[0])
+                if backtest is not None:
+                    backtest_table = backtest[['horizon', 'MAE', 'MAPE(%)', 'cutoffs']].rename(columns={
+                        'horizon': '예측 범위(개월)', 'MAE': 'MAE(대/일)', 'cutoffs': '평가 시점 수'})
+                    st.dataframe(backtest_table, hide_index=True)
+                else:
+                    history = cached_call("exporter_history", get_exporter_history, data_version,
+                                          selected_exporters[0], df, backend)
+                    if not backtesting.has_enough_history(backtesting.daily_series(history)):
+                        st.info(f"예측 정확도를 평가하기에 과거 데이터가 부족합니다. "
+                                f"(기준일 이전 선적일 {backtesting.MIN_TRAIN_POINTS}일 이상 필요)")
+                    elif st.button("📏 예측 정확도 평가 실행", key="run_backtest"):
+                        with st.spinner("여러 시점에서 모델을 재학습하여 정확도를 평가 중입니다."):
+                            with metrics.span("prophet.backtest"):
+                                # 서버 스레드 안에서는 프로세스 풀 없이 현재 프로세스에서 실행
+                                backtesting.backtest_exporters(history, selected_exporters[:1], data_version,
+                                                               in_process=True)
+                        st.rerun(scope="fragment")
+            except Exception as e:
+                st.error(f"예측 분석 중 오류 발생: {e}")
 
-        
 
 
+    
 
 
 
 
 
-        
-        st.markdown(
-          "<hr style='margin-top: 10px; margin-bottom: 10px;'>",
-               unsafe_allow_html=True
-                    )
-        st.markdown("✨ **AI 고객 분석 보고서**")
 
-        with st.expander("🔍 **AI 고객 분석 보고서 확인**", expanded=False):     
+
+    
+    st.markdown(
+      "<hr style='margin-top: 10px; margin-bottom: 10px;'>",
+           unsafe_allow_html=True
+                )
+    st.markdown("✨ **AI 고객 분석 보고서**")
+
+    with st.expander("🔍 **AI 고객 분석 보고서 확인**", expanded=False):     
+        # 저장된 보고서가 있으면 즉시 표시, 없을 때만 생성
+        report_store = reports.ReportStore(data_version or "unversioned")
+        stored = report_store.latest(selected_exporters[0])
+        if stored is not None and not st.button("🔄 보고서 새로 생성", key="regenerate_report"):
+            st.caption(f"저장된 보고서 (v{stored['version']}, {stored['created_at']})")
+            st.markdown(stored['content'])
+        else:
             with st.spinner("AI가 보고서를 생성하고 있습니다. 잠시만 기다려 주세요."):
-                report = generate_exporter_report(selected_exporters[0], df)
+                history = cached_call("exporter_history", get_exporter_history, data_version,
+                                      selected_exporters[0], df, backend)
+                report, usage = generate_exporter_report(selected_exporters[0], history)
+            if report is None:
+                st.warning("해당 수출자에 대한 데이터가 없습니다.")
+            else:
+                report_store.save(selected_exporters[0], report, usage=usage)
                 st.success("고객 분석 보고서가 생성되었습니다.")
                 st.markdown(report)
-        if 'generate_exporter_report' in st.session_state:
-            st.markdown(st.session_state.generate_exporter_report)
+    if 'generate_exporter_report' in st.session_state:
+        st.markdown(st.session_state.generate_exporter_report)
+
+               
+
+def app():
+    # 쿼리 파라미터에 home 있으면 홈 초기화
+    if "home" in st.query_params:
+        reset_to_home()
+
+    # 인증 확인 (여기서는 새 로그인 UI를 만들지 않음)
+    if not st.session_state.get('authorized', False):
+        show_login()  # 방어적 호출
+
+    # ---- 여기부터 대시보드 ----
+    if not st.session_state.get('has_search_results', False) and not st.session_state.get('has_analysis_results', False):
+        st.header("Data & AI 활용 국내 수출 컨테이너 고객 분석")
+        st.markdown("<hr style='margin-top: 10px; margin-bottom: 10px;'>", unsafe_allow_html=True)
+
+    ensure_metrics_server()
+
+    with st.spinner("⏳ 조금만 기다려주세요. 데이터 로딩 중입니다. (1분 정도 소요됩니다)"):
+        data_version = current_data_version()
+        df = None
+        if not OUT_OF_CORE or data_version is None:
+            with metrics.span("load_data"):
+                df = cached_call("load_data", load_data, data_version)
+            if df is None:
+                return
+        # 디스크 청크 모드는 df 없이 원본 엑셀을 청크 단위로 스트리밍해 저장소 생성
+        backend = cached_call("query_backend", get_query_backend, data_version, df)
+
+    # 세션 키 기본값 설정
+    for key, val in {
+        'has_search_results': False,
+        'has_analysis_results': False,
+        'analysis_data': None,
+    }.items():
+        if key not in st.session_state:
+            st.session_state[key] = val
+
+    options = get_filter_options(data_version, df, backend)
+    min_date = options['min_date']
+    max_date = options['max_date']
+
+    default_keys = {
+        'start_date': min_date,
+        'end_date': max_date,
+        'region': 'All',
+        'loading_port': 'All',
+        'arrival_country': 'All',
+        'arrival_port': 'All',
+        'min_containers': 0,
+        'exporters': [],
+    }
+    for key, val in default_keys.items():
+        if key not in st.session_state:
+            st.session_state[key] = val
+
+    with st.sidebar:
+        sidebar_filters(df, data_version, backend)
+
+    # 고객 검색 결과 표시
+    if st.session_state.has_search_results and st.session_state.get('search_conditions'):
+        show_search_results(df, data_version, backend)
+
+
+    show_metrics_panel()
+
+    with st.sidebar:
+     
+     st.markdown(
+        "<div style='font-size:11px; text-align:center; color:gray;'>ⓒ 2025 Sehyuk Han</div>",
+        unsafe_allow_html=True
+    )
+    
+    # 분석 결과 표시 (세션 상태 기반)
+    if st.session_state.has_analysis_results and st.session_state.analysis_data:
+        show_analysis_results(df, data_version, backend)
 
-                   
     if not st.session_state.has_search_results and not st.session_state.has_analysis_results:
-        show_data_overview(df)
+        if df is None:
+            show_chunk_overview(backend)
+        else:
+            show_data_overview(cached_call("summary_store", get_summary_store, data_version, df))
 
 if __name__ == "__main__":
     app()
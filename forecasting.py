@@ -0,0 +1,117 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import query_engine as qe
+
+# =======================================
+# 시장(레인) 단위 배치 예측
+#  - 지역 / 도착지국가 / 도착항 / 컨테이너선사 별 향후 3개월 컨테이너 수
+#  - 모든 값(series)을 하나의 최소제곱 문제로 동시에 학습 (벡터화)
+#    : 선형 추세 + 월 계절성(24개월 이상일 때)
+#  - 각 차원의 합계가 전체 시장 예측과 같아지도록 비례 조정 (reconciliation)
+#    : 차원 값이 비어 있는 행은 '미상' 으로 묶어 하위 합계 = 전체 실적 유지
+#  - 결과는 데이터 버전별로 저장 → 화면은 저장된 결과만 읽음
+#  - 실행: python forecasting.py
+# =======================================
+FORECAST_DIMENSIONS = ['지역', '도착지국가', '도착항', '컨테이너선사']
+FORECAST_HORIZON = 3  # 개월
+TOTAL_KEY = '전체'
+UNKNOWN_KEY = '미상'
+
+
+def complete_months(df):
+    # 마지막 달이 월말까지 채워지지 않았으면 학습에서 제외
+    months = df['선적일'].dt.to_period('M')
+    last_date = df['선적일'].max()
+    last_month = months.max()
+    if last_date < last_month.to_timestamp(how='end').normalize():
+        last_month = last_month - 1
+    return pd.period_range(months.min(), last_month, freq='M')
+
+
+def monthly_matrix(df, dimension, months):
+    # 행: 월, 열: 차원 값
+    monthly = df.assign(**{'월': df['선적일'].dt.to_period('M'), dimension: df[dimension].fillna(UNKNOWN_KEY)})
+    monthly = monthly[monthly['월'].isin(months)]
+    matrix = monthly.pivot_table(index='월', columns=dimension, values='컨테이너수', aggfunc='sum', fill_value=0)
+    return matrix.reindex(months, fill_value=0).astype(float)
+
+
+def _design(months, seasonal, offset=0):
+    t = np.arange(offset, offset + len(months), dtype=float)
+    columns = [np.ones_like(t), t]
+    if seasonal:
+        month_of_year = np.array([m.month for m in months])
+        columns += [(month_of_year == m).astype(float) for m in range(2, 13)]
+    return np.column_stack(columns)
+
+
+def batch_forecast(matrix, horizon=FORECAST_HORIZON):
+    # matrix (T x N) 전체를 한 번의 lstsq 로 학습
+    months = matrix.index
+    seasonal = len(months) >= 24
+    X = _design(months, seasonal)
+    coef, *_ = np.linalg.lstsq(X, matrix.to_numpy(), rcond=None)
+
+    future_months = pd.period_range(months[-1] + 1, periods=horizon, freq='M')
+    X_future = _design(future_months, seasonal, offset=len(months))
+    forecast = np.clip(X_future @ coef, 0, None)
+    return pd.DataFrame(forecast, index=future_months, columns=matrix.columns)
+
+
+def reconcile(forecast, total):
+    # 하위 값 예측 합계가 전체 예측과 일치하도록 월별 비례 조정
+    sums = forecast.sum(axis=1).to_numpy()
+    scale = np.divide(total.to_numpy(), sums, out=np.zeros_like(sums), where=sums > 0)
+    return forecast.mul(scale, axis=0)
+
+
+def build_market_forecasts(df, horizon=FORECAST_HORIZON):
+    months = complete_months(df)
+    total_actual = monthly_matrix(df.assign(**{TOTAL_KEY: TOTAL_KEY}), TOTAL_KEY, months)
+    total_forecast = batch_forecast(total_actual, horizon)[TOTAL_KEY]
+
+    results = {TOTAL_KEY: {'actual': total_actual, 'forecast': total_forecast.to_frame()}}
+    for dimension in FORECAST_DIMENSIONS:
+        actual = monthly_matrix(df, dimension, months)
+        forecast = reconcile(batch_forecast(actual, horizon), total_forecast)
+        results[dimension] = {'actual': actual, 'forecast': forecast}
+    return results
+
+
+def _store_path(data_version):
+    return qe.cache_path('forecasts', data_version, 'market_forecasts.pkl')
+
+
+def save_market_forecasts(results, data_version):
+    path = _store_path(data_version)
+    pd.to_pickle(results, path + '.tmp')
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def load_market_forecasts(data_version):
+    path = _store_path(data_version)
+    if not os.path.exists(path):
+        return None
+    return pd.read_pickle(path)
+
+
+def lane_forecast(results, dimension, value):
+    # 화면 표시용: 월 / 실적 / 예측 (정수) 테이블
+    entry = results[dimension]
+    actual = entry['actual'][value].rename('실적')
+    forecast = entry['forecast'][value].round(0).astype(int).rename('예측')
+    combined = pd.concat([actual, forecast], axis=1)
+    combined.index = combined.index.astype(str)
+    return combined.rename_axis('월').reset_index()
+
+
+if __name__ == "__main__":
+    version = qe.data_version()
+    results = build_market_forecasts(qe.read_shipments())
+    path = save_market_forecasts(results, version)
+    sizes = ", ".join(f"{dim}={results[dim]['forecast'].shape[1]}" for dim in FORECAST_DIMENSIONS)
+    print(f"saved {path} ({sizes})")
@@ -0,0 +1,137 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+import query_engine as qe
+import regions
+from forecasting import complete_months
+
+# =======================================
+# 성장/모멘텀 고객 순위
+#  - 전체 수출자의 월별 컨테이너 수를 한 번에 집계 (수출자 x 월 행렬)
+#  - 성장률 / 추세 기울기 / 변동성을 행렬 연산으로 계산
+#  - 조건(지역/선적항/도착지국가/도착항)별 월별 행렬을 저장해 두고,
+#    새 데이터가 오면 마지막 저장 월 이후만 다시 집계 (과거 월은 재계산 안 함)
+#  - 저장소 키에 원본 파일 경로/행 형식을 포함하고, 과거 월의 월별 건수/합계가
+#    새 데이터와 다르면 (과거 행 수정/삭제) 처음부터 다시 집계
+# =======================================
+LEADERBOARD_MONTHS = 12   # 추세/변동성 계산 기간
+GROWTH_MONTHS = 3         # 최근 3개월 vs 직전 3개월
+
+
+def monthly_exporter_matrix(df):
+    # 행: 수출자, 열: 월 (Period)
+    months = df['선적일'].dt.to_period('M').rename('월')
+    return df.groupby(['수출자', months])['컨테이너수'].sum().unstack(fill_value=0)
+
+
+def monthly_totals(df):
+    # 증분 갱신 전 과거 월 변경 여부 확인용 (월별 선적 건 / 컨테이너 수)
+    months = df['선적일'].dt.to_period('M').rename('월')
+    return df.groupby(months)['컨테이너수'].agg(records='size', containers='sum')
+
+
+def apply_dimension_filters(df, loading_port='All', arrival_country='All', arrival_port='All', region='All'):
+    if region != 'All':
+        df = df[df[regions.REGION_COLUMN] == region]
+    if loading_port != 'All':
+        df = df[df['선적항'] == loading_port]
+    if arrival_country != 'All':
+        df = df[df['도착지국가'] == arrival_country]
+    if arrival_port != 'All':
+        df = df[df['도착항'] == arrival_port]
+    return df
+
+
+class MonthlyMatrixStore:
+    # 조건별 수출자 x 월 행렬을 디스크에 보관하고 증분 갱신
+    def __init__(self, loading_port='All', arrival_country='All', arrival_port='All', region='All',
+                 source=qe.PREDEFINED_FILE_PATH):
+        self.filters = {'loading_port': loading_port, 'arrival_country': arrival_country, 'arrival_port': arrival_port}
+        if region != 'All':
+            self.filters['region'] = region
+        # 데이터 계보: 원본 파일과 행 형식이 다르면 다른 저장소
+        lineage = {'source': os.path.abspath(source), 'schema': qe.ROW_SCHEMA}
+        key = "|".join(f"{k}={v}" for k, v in {**lineage, **self.filters}.items())
+        slug = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        self.path = qe.cache_path('leaderboard', slug, 'monthly.pkl')
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return None
+        return pd.read_pickle(self.path)
+
+    def refresh(self, df, data_version):
+        state = self._load()
+        if state is not None and state['data_version'] == data_version:
+            return state['matrix']
+
+        rows = apply_dimension_filters(df, **self.filters)
+        totals = monthly_totals(rows)
+        if state is None or not self._history_unchanged(state, totals):
+            matrix = monthly_exporter_matrix(rows)
+        else:
+            # 마지막 저장 월(부분 월일 수 있음) 부터 다시 집계해 덮어씀
+            since = state['matrix'].columns.max()
+            recent = rows[rows['선적일'].dt.to_period('M') >= since]
+            matrix = state['matrix'].drop(columns=[m for m in state['matrix'].columns if m >= since])
+            matrix = matrix.add(monthly_exporter_matrix(recent), fill_value=0)
+            matrix = matrix.reindex(columns=sorted(matrix.columns)).fillna(0)
+
+        pd.to_pickle({'data_version': data_version, 'matrix': matrix, 'totals': totals}, self.path + '.tmp')
+        os.replace(self.path + '.tmp', self.path)
+        return matrix
+
+    @staticmethod
+    def _history_unchanged(state, totals):
+        # 다시 집계하지 않을 과거 월(마지막 저장 월 이전)의 월별 건수/합계가 그대로인지 확인
+        if 'totals' not in state or state['matrix'].empty:
+            return False
+        since = state['matrix'].columns.max()
+        old = state['totals'][state['totals'].index < since]
+        new = totals[totals.index < since]
+        months = old.index.union(new.index)
+        return old.reindex(months, fill_value=0).astype(float).equals(new.reindex(months, fill_value=0).astype(float))
+
+
+def growth_metrics(matrix, last_month, months=LEADERBOARD_MONTHS, growth_months=GROWTH_MONTHS):
+    window = pd.period_range(last_month - months + 1, last_month, freq='M')
+    values = matrix.reindex(columns=window, fill_value=0).to_numpy(dtype=float)
+
+    recent = values[:, -growth_months:].sum(axis=1)
+    previous = values[:, -2 * growth_months:-growth_months].sum(axis=1)
+    mean = values.mean(axis=1)
+
+    # 최소제곱 기울기 (월당 컨테이너 수 증감)
+    t = np.arange(months, dtype=float)
+    t_centered = t - t.mean()
+    slope = (values - mean[:, None]) @ t_centered / (t_centered ** 2).sum()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(previous > 0, (recent - previous) / previous * 100, np.nan)
+        slope_pct = np.where(mean > 0, slope / mean * 100, np.nan)
+        volatility = np.where(mean > 0, values.std(axis=1) / mean, np.nan)
+
+    board = pd.DataFrame({
+        '수출자': matrix.index,
+        '기간 컨테이너수': values.sum(axis=1).astype(int),
+        f'최근 {growth_months}개월': recent.astype(int),
+        f'직전 {growth_months}개월': previous.astype(int),
+        '성장률(%)': np.round(growth, 1),
+        '추세(대/월)': np.round(slope, 2),
+        '추세(%/월)': np.round(slope_pct, 1),
+        '변동성(CV)': np.round(volatility, 2),
+    })
+    return board[board['기간 컨테이너수'] > 0].reset_index(drop=True)
+
+
+def growth_leaderboard(df, data_version, loading_port='All', arrival_country='All', arrival_port='All',
+                       min_containers=0, sort_by='성장률(%)', region='All'):
+    store = MonthlyMatrixStore(loading_port, arrival_country, arrival_port, region)
+    matrix = store.refresh(df, data_version)
+    last_month = complete_months(df)[-1]
+    board = growth_metrics(matrix, last_month)
+    board = board[board['기간 컨테이너수'] >= min_containers]
+    return board.sort_values(sort_by, ascending=False, na_position='last').reset_index(drop=True)
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# =======================================
+# 선사 x 시장(지역/도착지국가/도착항) 점유율 행렬
+#  - 월별 희소 행렬(scipy.sparse) 로 전체 시장 물동량을 보관
+#  - 기간/국가/항구/선사 조회는 원본 행이 아닌 행렬 슬라이스로 계산
+#  - 데이터 버전당 한 번 생성 (container.py 에서 st.cache_resource 로 보관)
+# =======================================
+CARRIER_COLUMN = '컨테이너선사'
+MARKET_COLUMNS = ['지역', '도착지국가', '도착항']
+
+
+class MarketShareMatrix:
+    def __init__(self, df, market_column):
+        self.market_column = market_column
+        rows = df.dropna(subset=[CARRIER_COLUMN, market_column])
+        carrier_codes, self.carriers = pd.factorize(rows[CARRIER_COLUMN], sort=True)
+        market_codes, self.markets = pd.factorize(rows[market_column], sort=True)
+        months = rows['선적일'].dt.to_period('M')
+        month_codes, self.months = pd.factorize(months, sort=True)
+
+        self._carrier_pos = {name: i for i, name in enumerate(self.carriers)}
+        self._market_pos = {name: i for i, name in enumerate(self.markets)}
+
+        shape = (len(self.carriers), len(self.markets))
+        volume = rows['컨테이너수'].fillna(0).to_numpy(dtype=float)
+        self._slices = []
+        order = np.argsort(month_codes, kind='stable')
+        bounds = np.searchsorted(month_codes[order], np.arange(len(self.months) + 1))
+        for m in range(len(self.months)):
+            idx = order[bounds[m]:bounds[m + 1]]
+            # 같은 (선사, 시장) 좌표는 csr 변환 시 합산됨
+            self._slices.append(sparse.csr_matrix((volume[idx], (carrier_codes[idx], market_codes[idx])), shape=shape))
+
+    def volume(self, start_date=None, end_date=None):
+        start = pd.Period(start_date, 'M') if start_date is not None else self.months[0]
+        end = pd.Period(end_date, 'M') if end_date is not None else self.months[-1]
+        selected = [s for month, s in zip(self.months, self._slices) if start <= month <= end]
+        if not selected:
+            return sparse.csr_matrix((len(self.carriers), len(self.markets)))
+        return sum(selected[1:], selected[0])
+
+    def share_table(self, start_date=None, end_date=None, market=None, carrier=None):
+        # 시장(열) 내 선사 점유율: 컨테이너수 / 시장 합계
+        volume = self.volume(start_date, end_date).tocsc()
+        market_totals = np.asarray(volume.sum(axis=0)).ravel()
+
+        if market is not None:
+            if market not in self._market_pos:
+                return self._empty_table()
+            volume = volume[:, [self._market_pos[market]]]
+            market_totals = market_totals[[self._market_pos[market]]]
+            market_names = [market]
+        else:
+            market_names = self.markets
+
+        coo = volume.tocoo()
+        table = pd.DataFrame({
+            self.market_column: np.asarray(market_names)[coo.col],
+            CARRIER_COLUMN: np.asarray(self.carriers)[coo.row],
+            '컨테이너수': coo.data.astype(int),
+            '비중(%)': (coo.data / market_totals[coo.col] * 100).round(1),
+        })
+        if carrier is not None:
+            table = table[table[CARRIER_COLUMN] == carrier]
+        return table.sort_values([self.market_column, '컨테이너수'], ascending=[True, False]).reset_index(drop=True)
+
+    def _empty_table(self):
+        return pd.DataFrame(columns=[self.market_column, CARRIER_COLUMN, '컨테이너수', '비중(%)'])
+
+    def heatmap_frame(self, start_date=None, end_date=None, top_carriers=10, top_markets=15):
+        # 물량 상위 선사 x 상위 시장의 점유율(%) 표 (heatmap 입력)
+        volume = self.volume(start_date, end_date)
+        market_totals = np.asarray(volume.sum(axis=0)).ravel()
+        carrier_totals = np.asarray(volume.sum(axis=1)).ravel()
+        markets = np.argsort(-market_totals)[:top_markets]
+        carriers = np.argsort(-carrier_totals)[:top_carriers]
+        markets = markets[market_totals[markets] > 0]
+        carriers = carriers[carrier_totals[carriers] > 0]
+
+        dense = volume[carriers][:, markets].toarray()
+        share = dense / market_totals[markets] * 100
+        return pd.DataFrame(
+            share.round(1),
+            index=pd.Index(np.asarray(self.carriers)[carriers], name=CARRIER_COLUMN),
+            columns=pd.Index(np.asarray(self.markets)[markets], name=self.market_column),
+        )
+
+
+def build_market_matrices(df):
+    return {column: MarketShareMatrix(df, column) for column in MARKET_COLUMNS}
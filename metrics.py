@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# =======================================
+# 프로세스 내 메트릭 레지스트리
+#  - Streamlit 재실행(rerun)에도 모듈은 유지되므로 값이 누적됨
+#  - 구간(span) 소요시간 / 카운터 두 종류만 관리
+# =======================================
+METRICS_PORT = int(os.environ.get("CONTAINER_METRICS_PORT", "9464"))
+SPAN_WINDOW = 1000  # 구간별로 보관하는 최근 측정값 개수 (p50/p95 계산용)
+
+
+class MetricsRegistry:
+    def __init__(self, window=SPAN_WINDOW):
+        self._lock = threading.Lock()
+        self._window = window
+        self._spans = defaultdict(lambda: deque(maxlen=self._window))
+        self._span_count = defaultdict(int)
+        self._span_sum = defaultdict(float)
+        self._counters = defaultdict(float)
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self._spans[stage].append(seconds)
+            self._span_count[stage] += 1
+            self._span_sum[stage] += seconds
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def counter_value(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def span_summary(self):
+        # 구간별 호출 수 / 합계 / p50 / p95 / 최대값
+        with self._lock:
+            stages = {stage: list(values) for stage, values in self._spans.items()}
+            counts = dict(self._span_count)
+            sums = dict(self._span_sum)
+
+        rows = []
+        for stage, values in sorted(stages.items()):
+            arr = np.asarray(values)
+            rows.append({
+                'stage': stage,
+                'count': counts[stage],
+                'sum_s': sums[stage],
+                'p50_ms': float(np.percentile(arr, 50)) * 1000,
+                'p95_ms': float(np.percentile(arr, 95)) * 1000,
+                'max_ms': float(arr.max()) * 1000,
+            })
+        return rows
+
+    def counter_summary(self):
+        with self._lock:
+            items = list(self._counters.items())
+        return [
+            {'name': name, 'labels': dict(labels), 'value': value}
+            for (name, labels), value in sorted(items)
+        ]
+
+    def render_prometheus(self):
+        # Prometheus 텍스트 포맷 (summary + counter)
+        lines = [
+            "# HELP container_stage_seconds Time spent per app stage.",
+            "# TYPE container_stage_seconds summary",
+        ]
+        for row in self.span_summary():
+            stage = _escape(row['stage'])
+            lines.append(f'container_stage_seconds{{stage="{stage}",quantile="0.5"}} {row["p50_ms"] / 1000:.6f}')
+            lines.append(f'container_stage_seconds{{stage="{stage}",quantile="0.95"}} {row["p95_ms"] / 1000:.6f}')
+            lines.append(f'container_stage_seconds_sum{{stage="{stage}"}} {row["sum_s"]:.6f}')
+            lines.append(f'container_stage_seconds_count{{stage="{stage}"}} {row["count"]}')
+
+        declared = set()
+        for row in self.counter_summary():
+            name = f"container_{row['name']}"
+            if name not in declared:
+                lines.append(f"# TYPE {name} counter")
+                declared.add(name)
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in row['labels'].items())
+            label_str = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}{label_str} {row['value']:g}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._span_count.clear()
+            self._span_sum.clear()
+            self._counters.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = MetricsRegistry()
+
+
+# 모듈 수준 단축 함수
+def span(stage):
+    return REGISTRY.span(stage)
+
+
+def inc(name, value=1, **labels):
+    REGISTRY.inc(name, value, **labels)
+
+
+def record_llm_usage(purpose, response, seconds):
+    # OpenAI 응답의 usage 정보를 토큰 카운터로 기록
+    inc("llm_requests_total", purpose=purpose)
+    inc("llm_latency_seconds_total", seconds, purpose=purpose)
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        inc("llm_prompt_tokens_total", getattr(usage, "prompt_tokens", 0) or 0, purpose=purpose)
+        inc("llm_completion_tokens_total", getattr(usage, "completion_tokens", 0) or 0, purpose=purpose)
+
+
+# =======================================
+# Prometheus 스크레이프용 로컬 HTTP 엔드포인트
+#  - GET /metrics
+# =======================================
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# =======================================
+# 수출자-수입자 이분 그래프 (역색인)
+#  - 수출자 x 수입자 희소 행렬, 가중치 = 컨테이너 수
+#  - 수입자 → 수출자 역조회 / 수입자를 공유하는 수출자 조회
+#  - 데이터 버전당 한 번 생성 (container.py 에서 st.cache_resource 로 보관)
+# =======================================
+
+
+class ExporterImporterNetwork:
+    def __init__(self, df):
+        rows = df.dropna(subset=['수출자', '수입자'])
+        exporter_codes, self.exporters = pd.factorize(rows['수출자'].astype(str))
+        importer_codes, self.importers = pd.factorize(rows['수입자'].astype(str))
+        weights = rows['컨테이너수'].fillna(0).to_numpy(dtype=float)
+
+        shape = (len(self.exporters), len(self.importers))
+        self.matrix = sparse.csr_matrix((weights, (exporter_codes, importer_codes)), shape=shape)
+        self.reverse = self.matrix.T.tocsr()  # 수입자 x 수출자
+        self.links = self.matrix.copy()
+        self.links.data = np.ones_like(self.links.data)  # 거래 여부 (0/1)
+
+        self._exporter_pos = {name: i for i, name in enumerate(self.exporters)}
+        self._importer_pos = {name: i for i, name in enumerate(self.importers)}
+
+    @staticmethod
+    def _row_table(matrix, pos, labels, label_column):
+        row = matrix.getrow(pos)
+        table = pd.DataFrame({
+            label_column: np.asarray(labels)[row.indices],
+            '컨테이너수': row.data.astype(int),
+        })
+        return table.sort_values('컨테이너수', ascending=False).reset_index(drop=True)
+
+    def exporters_for_importer(self, importer):
+        if importer not in self._importer_pos:
+            return pd.DataFrame(columns=['수출자', '컨테이너수'])
+        return self._row_table(self.reverse, self._importer_pos[importer], self.exporters, '수출자')
+
+    def importers_for_exporter(self, exporter):
+        if exporter not in self._exporter_pos:
+            return pd.DataFrame(columns=['수입자', '컨테이너수'])
+        return self._row_table(self.matrix, self._exporter_pos[exporter], self.importers, '수입자')
+
+    def shared_consignees(self, exporter, top_n=20):
+        # 같은 수입자에게 선적하는 다른 수출자 (공유 수입자 수 기준)
+        if exporter not in self._exporter_pos:
+            return pd.DataFrame(columns=['수출자', '공유 수입자', '유사도', '공유 수입자 컨테이너수'])
+
+        pos = self._exporter_pos[exporter]
+        target = self.links.getrow(pos).T  # 수입자 x 1
+        shared = np.asarray((self.links @ target).todense()).ravel()
+        shared_volume = np.asarray((self.matrix @ target).todense()).ravel()
+        degree = np.asarray(self.links.sum(axis=1)).ravel()
+
+        shared[pos] = 0
+        candidates = np.flatnonzero(shared)
+        jaccard = shared[candidates] / (degree[pos] + degree[candidates] - shared[candidates])
+        table = pd.DataFrame({
+            '수출자': np.asarray(self.exporters)[candidates],
+            '공유 수입자': shared[candidates].astype(int),
+            '유사도': jaccard.round(3),
+            '공유 수입자 컨테이너수': shared_volume[candidates].astype(int),
+        })
+        return table.sort_values(['공유 수입자', '공유 수입자 컨테이너수'], ascending=False).head(top_n).reset_index(drop=True)
+
+    def shared_importers(self, exporter_a, exporter_b):
+        a = self.importers_for_exporter(exporter_a)
+        b = self.importers_for_exporter(exporter_b)
+        return a.merge(b, on='수입자', suffixes=(f' ({exporter_a})', f' ({exporter_b})'))
@@ -0,0 +1,188 @@
+import os
+
+import pandas as pd
+
+import regions
+
+# =======================================
+# 조회/집계 엔진 (Streamlit 비의존)
+#  - container.py 화면과 api_server.py 가 같은 로직을 사용
+# =======================================
+PREDEFINED_FILE_PATH = 'combined4.xlsx'
+CACHE_DIR = os.environ.get('CONTAINER_CACHE_DIR', '.cache')  # 데이터 버전별 파생 데이터 저장 위치
+ROW_SCHEMA = 'r3'  # 행 단위 스냅샷(청크/Parquet) 형식 - 적재 시 추가 컬럼이 바뀌면 변경 (r2: 지역, r3: 국가명 악센트/전각 정규화)
+
+
+def read_shipments(path=PREDEFINED_FILE_PATH):
+    # 적재 시점에 도착지국가 → 지역 컬럼 추가
+    return regions.add_region(pd.read_excel(path, parse_dates=['선적일'], engine='openpyxl'))
+
+
+def data_version(path=PREDEFINED_FILE_PATH):
+    # 원본 파일이 바뀌면 달라지는 버전 문자열 (캐시 키로 사용)
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+def row_snapshot_version(data_version):
+    # 원본 행을 그대로 저장하는 파생 데이터용 키 (집계 결과 저장소는 data_version 그대로 사용)
+    return f"{data_version}-{ROW_SCHEMA}"
+
+
+def cache_path(kind, data_version, filename):
+    # 예) .cache/snapshots/<data_version>/shipments.parquet
+    directory = os.path.join(CACHE_DIR, kind, data_version)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
+
+
+def filter_by_date(df, start_date, end_date):
+    return df[(df['선적일'] >= pd.to_datetime(start_date)) & (df['선적일'] <= pd.to_datetime(end_date))]
+
+
+def filter_conditions(df, start_date, end_date, loading_port, arrival_port, arrival_country, region='All'):
+    # 최소 컨테이너 수를 제외한 행 단위 조건 (청크 단위로도 그대로 적용 가능)
+    df = filter_by_date(df, start_date, end_date)
+
+    if region != 'All':
+        df = df[df[regions.REGION_COLUMN] == region]
+    if loading_port != 'All':
+        df = df[df['선적항'] == loading_port]
+    if arrival_country != 'All':
+        df = df[df['도착지국가'] == arrival_country]
+    if arrival_port != 'All':
+        df = df[df['도착항'] == arrival_port]
+    return df
+
+
+def kept_exporters(exporter_totals, min_containers):
+    # exporter_totals: 수출자별 컨테이너수 합계 (Series)
+    return exporter_totals.index[exporter_totals >= min_containers]
+
+
+def filter_data(df, start_date, end_date, loading_port, arrival_port, arrival_country, min_containers, region='All'):
+    df = filter_conditions(df, start_date, end_date, loading_port, arrival_port, arrival_country, region)
+
+    totals = df.groupby('수출자')['컨테이너수'].sum()
+    filtered_df = df[df['수출자'].isin(kept_exporters(totals, min_containers))]
+
+    return filtered_df
+
+
+def exporter_rows(df, exporters, start_date, end_date):
+    date_filtered_df = filter_by_date(df, start_date, end_date)
+    return date_filtered_df[date_filtered_df['수출자'].isin(exporters)]
+
+
+# =======================================
+# 조건 검색 결과 (순위 테이블)
+# =======================================
+def _rank_by(df, key):
+    return rank_totals(df.groupby(key).agg({'컨테이너수': 'sum'}).reset_index(), key)
+
+
+def rank_totals(grouped, key):
+    # grouped: key 오름차순으로 정렬된 [key, 컨테이너수] 합계 표
+    grouped = grouped.sort_values(by='컨테이너수', ascending=False)
+    grouped['순위'] = grouped['컨테이너수'].rank(ascending=False, method='min')
+    return grouped[['순위', key, '컨테이너수']].reset_index(drop=True)
+
+
+def rank_exporters(filtered_df):
+    return _rank_by(filtered_df, '수출자')
+
+
+def rank_carriers(filtered_df):
+    return _rank_by(filtered_df, '컨테이너선사')
+
+
+# =======================================
+# 고객 상세 분석 (단일/복수 수출자 행 기준)
+# =======================================
+def customer_summary(rows):
+    return {
+        'records': len(rows),
+        'containers': int(rows['컨테이너수'].sum()),
+        'container_lines': rows['컨테이너선사'].nunique(),
+        'loading_ports': rows['선적항'].nunique(),
+        'countries': rows['도착지국가'].nunique(),
+        'arrival_ports': rows['도착항'].nunique(),
+    }
+
+
+def region_share(rows):
+    return regions.region_summary(rows)
+
+
+def country_share(rows):
+    arrival_country_sum = rows.groupby('도착지국가').agg({'컨테이너수': 'sum'}).reset_index()
+    arrival_country_sum = arrival_country_sum.sort_values(by='컨테이너수', ascending=False).reset_index(drop=True)
+    total_containers = arrival_country_sum['컨테이너수'].sum()
+    arrival_country_sum['비중(%)'] = (arrival_country_sum['컨테이너수'] / total_containers * 100).round(1)
+    return arrival_country_sum
+
+
+def route_breakdown(rows, with_total=True):
+    grouped_exporter = rows.groupby(['수출자', '선적항', '도착지국가', '도착항']).agg({'컨테이너수': 'sum'}).reset_index()
+    grouped_exporter = grouped_exporter.sort_values(by='컨테이너수', ascending=False).reset_index(drop=True)
+    return append_total_row(grouped_exporter) if with_total else grouped_exporter
+
+
+def append_total_row(grouped_exporter):
+    total_row = pd.DataFrame([{
+        '수출자': '총합계',
+        '선적항': '',
+        '도착지국가': '',
+        '도착항': '',
+        '컨테이너수': grouped_exporter['컨테이너수'].sum()
+    }])
+    return pd.concat([grouped_exporter, total_row], ignore_index=True)
+
+
+def country_carrier_share(rows):
+    grouped_by_country_line = rows.groupby(['도착지국가', '컨테이너선사']).agg({'컨테이너수': 'sum'}).reset_index()
+    total_per_country = grouped_by_country_line.groupby('도착지국가')['컨테이너수'].transform('sum')
+    grouped_by_country_line['비중(%)'] = (grouped_by_country_line['컨테이너수'] / total_per_country * 100).round(1)
+    return grouped_by_country_line.sort_values(by=['도착지국가', '컨테이너수'], ascending=[True, False]).reset_index(drop=True)
+
+
+def country_importer(rows):
+    return (
+        rows.groupby(['도착지국가', '수입자'])
+        .agg({'컨테이너수': 'sum'})
+        .reset_index()
+        .sort_values(['도착지국가', '컨테이너수'], ascending=[True, False])
+        .reset_index(drop=True)
+    )
+
+
+def monthly_containers(rows):
+    monthly = rows[['선적일', '컨테이너수']].copy()
+    monthly['월'] = monthly['선적일'].dt.to_period('M').astype(str)
+    return monthly.groupby('월')['컨테이너수'].sum().reset_index().sort_values(by='월').reset_index(drop=True)
+
+
+def customer_profile(rows):
+    # 분석 화면의 상세 테이블을 한 번에 묶은 결과
+    exporters = rows['수출자'].dropna().unique().tolist()
+    return {
+        'exporters': exporters,
+        'period': [rows['선적일'].min(), rows['선적일'].max()],
+        'summary': customer_summary(rows),
+        'region_share': region_share(rows),
+        'country_share': country_share(rows),
+        'route_breakdown': route_breakdown(rows, with_total=False),
+        'country_carrier': country_carrier_share(rows),
+        'country_importer': country_importer(rows),
+        'monthly': monthly_containers(rows),
+    }
+
+
+def iter_customer_profiles(filtered_df):
+    # 순위 순서대로 수출자별 프로필을 하나씩 생성 (대량 배치 조회용)
+    ranking = rank_exporters(filtered_df)
+    groups = filtered_df.groupby('수출자', sort=False)
+    for rank, exporter, containers in ranking.itertuples(index=False):
+        profile = customer_profile(groups.get_group(exporter))
+        profile['rank'] = int(rank)
+        yield profile
@@ -0,0 +1,291 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from text_normalize import fold_text
+
+# =======================================
+# 도착지국가 → 지역(대륙) 차원
+#  - 국가명(한글/영문) 또는 ISO 2자리 코드를 대소문자/공백/기호 무시하고 매핑
+#  - 북미 = 미국/캐나다, 남미 = 멕시코/중미/카리브 포함 중남미
+#  - 중동/중앙아시아는 아시아, 러시아/키프로스는 유럽
+#  - 매핑에 없는 국가는 '기타', 국가가 비어 있으면 지역도 비움
+# =======================================
+REGION_COLUMN = '지역'
+REGION_ORDER = ['아시아', '유럽', '북미', '남미', '아프리카', '오세아니아']
+UNKNOWN_REGION = '기타'
+
+# (ISO 코드, 한글명..., 영문명...)
+REGION_COUNTRIES = {
+    '아시아': [
+        ('CN', '중국', 'CHINA', "PEOPLE'S REPUBLIC OF CHINA", 'PR CHINA'),
+        ('JP', '일본', 'JAPAN'),
+        ('KR', '한국', '대한민국', 'KOREA', 'SOUTH KOREA', 'REPUBLIC OF KOREA'),
+        ('KP', '북한', 'NORTH KOREA'),
+        ('TW', '대만', '타이완', 'TAIWAN'),
+        ('HK', '홍콩', 'HONG KONG'),
+        ('MO', '마카오', 'MACAU', 'MACAO'),
+        ('MN', '몽골', 'MONGOLIA'),
+        ('VN', '베트남', 'VIETNAM', 'VIET NAM'),
+        ('TH', '태국', 'THAILAND'),
+        ('MY', '말레이시아', 'MALAYSIA'),
+        ('SG', '싱가포르', 'SINGAPORE'),
+        ('ID', '인도네시아', 'INDONESIA'),
+        ('PH', '필리핀', 'PHILIPPINES'),
+        ('KH', '캄보디아', 'CAMBODIA'),
+        ('LA', '라오스', 'LAOS'),
+        ('MM', '미얀마', 'MYANMAR', 'BURMA'),
+        ('BN', '브루나이', 'BRUNEI'),
+        ('TL', '동티모르', 'TIMOR-LESTE', 'EAST TIMOR'),
+        ('IN', '인도', 'INDIA'),
+        ('PK', '파키스탄', 'PAKISTAN'),
+        ('BD', '방글라데시', 'BANGLADESH'),
+        ('LK', '스리랑카', 'SRI LANKA'),
+        ('NP', '네팔', 'NEPAL'),
+        ('BT', '부탄', 'BHUTAN'),
+        ('MV', '몰디브', 'MALDIVES'),
+        ('AF', '아프가니스탄', 'AFGHANISTAN'),
+        ('KZ', '카자흐스탄', 'KAZAKHSTAN'),
+        ('UZ', '우즈베키스탄', 'UZBEKISTAN'),
+        ('KG', '키르기스스탄', 'KYRGYZSTAN'),
+        ('TJ', '타지키스탄', 'TAJIKISTAN'),
+        ('TM', '투르크메니스탄', 'TURKMENISTAN'),
+        ('AE', '아랍에미리트', 'UNITED ARAB EMIRATES', 'UAE'),
+        ('SA', '사우디아라비아', 'SAUDI ARABIA'),
+        ('QA', '카타르', 'QATAR'),
+        ('KW', '쿠웨이트', 'KUWAIT'),
+        ('BH', '바레인', 'BAHRAIN'),
+        ('OM', '오만', 'OMAN'),
+        ('YE', '예멘', 'YEMEN'),
+        ('IQ', '이라크', 'IRAQ'),
+        ('IR', '이란', 'IRAN'),
+        ('JO', '요르단', 'JORDAN'),
+        ('LB', '레바논', 'LEBANON'),
+        ('SY', '시리아', 'SYRIA'),
+        ('IL', '이스라엘', 'ISRAEL'),
+        ('PS', '팔레스타인', 'PALESTINE'),
+        ('TR', '튀르키예', '터키', 'TURKEY', 'TURKIYE'),
+        ('GE', '조지아', 'GEORGIA'),
+        ('AM', '아르메니아', 'ARMENIA'),
+        ('AZ', '아제르바이잔', 'AZERBAIJAN'),
+    ],
+    '유럽': [
+        ('GB', '영국', 'UNITED KINGDOM', 'UK', 'GREAT BRITAIN', 'ENGLAND'),
+        ('IE', '아일랜드', 'IRELAND'),
+        ('FR', '프랑스', 'FRANCE'),
+        ('DE', '독일', 'GERMANY'),
+        ('NL', '네덜란드', 'NETHERLANDS', 'HOLLAND'),
+        ('BE', '벨기에', 'BELGIUM'),
+        ('LU', '룩셈부르크', 'LUXEMBOURG'),
+        ('CH', '스위스', 'SWITZERLAND'),
+        ('AT', '오스트리아', 'AUSTRIA'),
+        ('IT', '이탈리아', 'ITALY'),
+        ('ES', '스페인', 'SPAIN'),
+        ('PT', '포르투갈', 'PORTUGAL'),
+        ('GR', '그리스', 'GREECE'),
+        ('MT', '몰타', 'MALTA'),
+        ('CY', '키프로스', 'CYPRUS'),
+        ('DK', '덴마크', 'DENMARK'),
+        ('NO', '노르웨이', 'NORWAY'),
+        ('SE', '스웨덴', 'SWEDEN'),
+        ('FI', '핀란드', 'FINLAND'),
+        ('IS', '아이슬란드', 'ICELAND'),
+        ('EE', '에스토니아', 'ESTONIA'),
+        ('LV', '라트비아', 'LATVIA'),
+        ('LT', '리투아니아', 'LITHUANIA'),
+        ('PL', '폴란드', 'POLAND'),
+        ('CZ', '체코', 'CZECH REPUBLIC', 'CZECHIA'),
+        ('SK', '슬로바키아', 'SLOVAKIA'),
+        ('HU', '헝가리', 'HUNGARY'),
+        ('SI', '슬로베니아', 'SLOVENIA'),
+        ('HR', '크로아티아', 'CROATIA'),
+        ('RS', '세르비아', 'SERBIA'),
+        ('BA', '보스니아헤르체고비나', 'BOSNIA AND HERZEGOVINA'),
+        ('ME', '몬테네그로', 'MONTENEGRO'),
+        ('MK', '북마케도니아', 'NORTH MACEDONIA', 'MACEDONIA'),
+        ('AL', '알바니아', 'ALBANIA'),
+        ('BG', '불가리아', 'BULGARIA'),
+        ('RO', '루마니아', 'ROMANIA'),
+        ('MD', '몰도바', 'MOLDOVA'),
+        ('UA', '우크라이나', 'UKRAINE'),
+        ('BY', '벨라루스', 'BELARUS'),
+        ('RU', '러시아', 'RUSSIA', 'RUSSIAN FEDERATION'),
+    ],
+    '북미': [
+        ('US', '미국', 'UNITED STATES', 'UNITED STATES OF AMERICA', 'USA'),
+        ('CA', '캐나다', 'CANADA'),
+        ('GL', '그린란드', 'GREENLAND'),
+        ('BM', '버뮤다', 'BERMUDA'),
+    ],
+    '남미': [
+        ('MX', '멕시코', 'MEXICO'),
+        ('GT', '과테말라', 'GUATEMALA'),
+        ('BZ', '벨리즈', 'BELIZE'),
+        ('HN', '온두라스', 'HONDURAS'),
+        ('SV', '엘살바도르', 'EL SALVADOR'),
+        ('NI', '니카라과', 'NICARAGUA'),
+        ('CR', '코스타리카', 'COSTA RICA'),
+        ('PA', '파나마', 'PANAMA'),
+        ('CU', '쿠바', 'CUBA'),
+        ('JM', '자메이카', 'JAMAICA'),
+        ('HT', '아이티', 'HAITI'),
+        ('DO', '도미니카공화국', 'DOMINICAN REPUBLIC'),
+        ('PR', '푸에르토리코', 'PUERTO RICO'),
+        ('BS', '바하마', 'BAHAMAS'),
+        ('TT', '트리니다드토바고', 'TRINIDAD AND TOBAGO'),
+        ('BB', '바베이도스', 'BARBADOS'),
+        ('BR', '브라질', 'BRAZIL'),
+        ('AR', '아르헨티나', 'ARGENTINA'),
+        ('CL', '칠레', 'CHILE'),
+        ('PE', '페루', 'PERU'),
+        ('CO', '콜롬비아', 'COLOMBIA'),
+        ('EC', '에콰도르', 'ECUADOR'),
+        ('VE', '베네수엘라', 'VENEZUELA'),
+        ('UY', '우루과이', 'URUGUAY'),
+        ('PY', '파라과이', 'PARAGUAY'),
+        ('BO', '볼리비아', 'BOLIVIA'),
+        ('GY', '가이아나', 'GUYANA'),
+        ('SR', '수리남', 'SURINAME'),
+    ],
+    '아프리카': [
+        ('EG', '이집트', 'EGYPT'),
+        ('LY', '리비아', 'LIBYA'),
+        ('TN', '튀니지', 'TUNISIA'),
+        ('DZ', '알제리', 'ALGERIA'),
+        ('MA', '모로코', 'MOROCCO'),
+        ('SD', '수단', 'SUDAN'),
+        ('SS', '남수단', 'SOUTH SUDAN'),
+        ('ET', '에티오피아', 'ETHIOPIA'),
+        ('ER', '에리트레아', 'ERITREA'),
+        ('DJ', '지부티', 'DJIBOUTI'),
+        ('SO', '소말리아', 'SOMALIA'),
+        ('KE', '케냐', 'KENYA'),
+        ('TZ', '탄자니아', 'TANZANIA'),
+        ('UG', '우간다', 'UGANDA'),
+        ('RW', '르완다', 'RWANDA'),
+        ('BI', '부룬디', 'BURUNDI'),
+        ('MZ', '모잠비크', 'MOZAMBIQUE'),
+        ('MG', '마다가스카르', 'MADAGASCAR'),
+        ('MU', '모리셔스', 'MAURITIUS'),
+        ('SC', '세이셸', 'SEYCHELLES'),
+        ('KM', '코모로', 'COMOROS'),
+        ('ZA', '남아프리카공화국', '남아공', 'SOUTH AFRICA'),
+        ('NA', '나미비아', 'NAMIBIA'),
+        ('BW', '보츠와나', 'BOTSWANA'),
+        ('ZW', '짐바브웨', 'ZIMBABWE'),
+        ('ZM', '잠비아', 'ZAMBIA'),
+        ('MW', '말라위', 'MALAWI'),
+        ('LS', '레소토', 'LESOTHO'),
+        ('SZ', '에스와티니', 'ESWATINI', 'SWAZILAND'),
+        ('AO', '앙골라', 'ANGOLA'),
+        ('CD', '콩고민주공화국', 'DEMOCRATIC REPUBLIC OF THE CONGO', 'DR CONGO'),
+        ('CG', '콩고', 'CONGO', 'REPUBLIC OF THE CONGO'),
+        ('GA', '가봉', 'GABON'),
+        ('GQ', '적도기니', 'EQUATORIAL GUINEA'),
+        ('CM', '카메룬', 'CAMEROON'),
+        ('CF', '중앙아프리카공화국', 'CENTRAL AFRICAN REPUBLIC'),
+        ('TD', '차드', 'CHAD'),
+        ('NG', '나이지리아', 'NIGERIA'),
+        ('NE', '니제르', 'NIGER'),
+        ('GH', '가나', 'GHANA'),
+        ('CI', '코트디부아르', "COTE D'IVOIRE", 'IVORY COAST'),
+        ('TG', '토고', 'TOGO'),
+        ('BJ', '베냉', 'BENIN'),
+        ('BF', '부르키나파소', 'BURKINA FASO'),
+        ('ML', '말리', 'MALI'),
+        ('SN', '세네갈', 'SENEGAL'),
+        ('GM', '감비아', 'GAMBIA'),
+        ('GN', '기니', 'GUINEA'),
+        ('GW', '기니비사우', 'GUINEA-BISSAU'),
+        ('SL', '시에라리온', 'SIERRA LEONE'),
+        ('LR', '라이베리아', 'LIBERIA'),
+        ('MR', '모리타니', 'MAURITANIA'),
+        ('CV', '카보베르데', 'CAPE VERDE', 'CABO VERDE'),
+    ],
+    '오세아니아': [
+        ('AU', '호주', '오스트레일리아', 'AUSTRALIA'),
+        ('NZ', '뉴질랜드', 'NEW ZEALAND'),
+        ('PG', '파푸아뉴기니', 'PAPUA NEW GUINEA'),
+        ('FJ', '피지', 'FIJI'),
+        ('SB', '솔로몬제도', 'SOLOMON ISLANDS'),
+        ('VU', '바누아투', 'VANUATU'),
+        ('NC', '뉴칼레도니아', 'NEW CALEDONIA'),
+        ('PF', '프랑스령폴리네시아', 'FRENCH POLYNESIA'),
+        ('WS', '사모아', 'SAMOA'),
+        ('TO', '통가', 'TONGA'),
+        ('KI', '키리바시', 'KIRIBATI'),
+        ('FM', '미크로네시아', 'MICRONESIA'),
+        ('MH', '마셜제도', 'MARSHALL ISLANDS'),
+        ('PW', '팔라우', 'PALAU'),
+        ('GU', '괌', 'GUAM'),
+        ('NR', '나우루', 'NAURU'),
+        ('TV', '투발루', 'TUVALU'),
+    ],
+}
+
+
+def normalize_country(name):
+    # 'Viet Nam' / 'VIETNAM' / 'viet-nam' / 'Viêt Nam' → 'vietnam'
+    return re.sub(r'[^0-9a-z가-힣]', '', fold_text(name))
+
+
+_REGION_BY_KEY = {
+    normalize_country(alias): region
+    for region, countries in REGION_COUNTRIES.items()
+    for country in countries
+    for alias in country
+}
+
+
+@lru_cache(maxsize=4096)
+def region_of(country):
+    return _REGION_BY_KEY.get(normalize_country(country), UNKNOWN_REGION)
+
+
+def add_region(df, country_column='도착지국가'):
+    # 고유 국가명만 매핑 후 코드로 펼침 (행 수와 무관하게 국가 수만큼만 조회)
+    codes, countries = pd.factorize(df[country_column])
+    lookup = np.array([region_of(country) for country in countries] + [None], dtype=object)
+    df[REGION_COLUMN] = lookup[codes]  # codes == -1 (국가 없음) → None
+    return df
+
+
+# =======================================
+# 지역 요약 (조건 검색 / 고객 분석 / AI 보고서 공용)
+# =======================================
+def summarize_country_totals(country_totals, top_countries=3):
+    # country_totals: [지역, 도착지국가, 컨테이너수] 합계 표 → 지역별 1행
+    columns = [REGION_COLUMN, '컨테이너수', '비중(%)', '국가 수', '주요 도착지국가']
+    country_totals = country_totals[country_totals['컨테이너수'] > 0]
+    if country_totals.empty:
+        return pd.DataFrame(columns=columns)
+
+    order = {region: i for i, region in enumerate(REGION_ORDER + [UNKNOWN_REGION])}
+    country_totals = country_totals.sort_values(['컨테이너수', '도착지국가'], ascending=[False, True])
+    rows = []
+    for region, group in country_totals.groupby(REGION_COLUMN, sort=False):
+        top = ", ".join(f"{country} {int(containers):,}" for country, containers
+                        in zip(group['도착지국가'].head(top_countries), group['컨테이너수'].head(top_countries)))
+        rows.append({REGION_COLUMN: region, '컨테이너수': group['컨테이너수'].sum(),
+                     '국가 수': len(group), '주요 도착지국가': top})
+    summary = pd.DataFrame(rows)
+    summary['비중(%)'] = (summary['컨테이너수'] / summary['컨테이너수'].sum() * 100).round(1)
+    summary['_order'] = summary[REGION_COLUMN].map(order)
+    summary = summary.sort_values(['컨테이너수', '_order'], ascending=[False, True])
+    return summary[columns].reset_index(drop=True)
+
+
+def region_summary(rows, top_countries=3):
+    country_totals = rows.groupby([REGION_COLUMN, '도착지국가'])['컨테이너수'].sum().reset_index()
+    return summarize_country_totals(country_totals, top_countries)
+
+
+def format_region_summary(summary):
+    # 프롬프트용 한 줄 요약: "아시아 1,234대 (45.2%, 8개국: 중국 500, 베트남 300, 일본 200)"
+    return "\n".join(
+        f"      · {row[REGION_COLUMN]} {int(row['컨테이너수']):,}대 ({row['비중(%)']}%, "
+        f"{row['국가 수']}개국: {row['주요 도착지국가']})"
+        for _, row in summary.iterrows()
+    )
@@ -0,0 +1,235 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from datetime import datetime
+
+import metrics
+import query_engine as qe
+import regions
+
+# =======================================
+# AI 고객 분석 보고서
+#  - 프롬프트 생성 (화면/배치 공용)
+#    · 국가 목록 대신 적재 시점 지역 차원으로 만든 지역별 요약을 전달
+#  - 보고서 저장소: 데이터 버전별, 수출자별 JSON (생성 이력 누적)
+#  - 배치 생성: python reports.py --top 50 [조건 옵션]
+#    · 동시 요청 수 제한 + 분당 요청 수 제한
+#    · Rate limit / 일시 오류 시 지수 백오프 재시도
+# =======================================
+REPORT_MODEL = "gpt-3.5-turbo"
+REPORT_SYSTEM_PROMPT = "You are an assistant that generates export container analysis reports."
+REPORT_DIR = os.environ.get('CONTAINER_REPORT_DIR', 'report_store')
+
+
+def build_report_prompt(수출자, df):
+    exporter_data = df[df['수출자'] == 수출자]
+
+    if exporter_data.empty:
+        return None
+
+    total_containers = exporter_data['컨테이너수'].sum()
+    main_routes = exporter_data.groupby('도착항')['컨테이너수'].sum().sort_values(ascending=False).head(5)
+    main_country = exporter_data.groupby('도착지국가')['컨테이너수'].sum().sort_values(ascending=False).head(5)
+    region_lines = regions.format_region_summary(regions.region_summary(exporter_data))
+
+    prompt = f"""
+    다음 데이터를 기반으로 '{수출자}'에 대한 컨테이너 수출 분석 보고서를 작성해 주세요:
+    국제물류 포워더로서 해당 수출자에게 컨테이너 물류 영업을 해야 합니다.
+    보고서 내용은 기업 개요, 컨테이너 수출 현황, 물류 영업 전략, 컨테이너 선사 협력 전략 네 부분으로 나눠서 작성해야 합니다.
+    기업 개요는 주요 사업이나 제품에 대해서 간단하게 설명해주세요.
+
+    - 컨테이너 선적 기간: {exporter_data['선적일'].min().date()} ~ {exporter_data['선적일'].max().date()}
+    - 총 수출한 컨테이너 수: {total_containers}
+    - 선적항별 컨테이너 수: {exporter_data.groupby('선적항')['컨테이너수'].sum().to_dict()}
+    - 지역별 컨테이너 수 (지역 / 대수 / 비중 / 국가 수 / 주요 국가):
+{region_lines}
+    - 컨테이너 수출 상위 5개 도착지국가: {main_country.to_dict()}
+    - 컨테이너 수출 상위 5개 도착항: {main_routes.to_dict()}
+    - 컨테이너 부킹 상위 5개 컨테이너 선사: {exporter_data.groupby('컨테이너선사')['컨테이너수'].sum().sort_values(ascending=False).head(5).to_dict()}
+
+    컨테이너 대수는 TEU나 개수로 표현하지 말고, '대수'로 표현해 주세요.
+    선적 기간을 반드시 명시하세요.
+    지역별 수출 현황은 위 지역 구분(아시아, 유럽, 북미, 남미, 아프리카, 오세아니아)을 그대로 사용해 주세요.
+    물류 영업 전략은 수출자의 주요한 도착지국가와 도착항을 바탕으로 타겟국가, 타겟항구 대상 영업을 확대 제안해주세요
+    컨테이너 선사 협력 전략은 어떤 컨테이너 선사와 협력하는 것이 좋을지 컨테이너 부킹 선사를 바탕으로 제안해주세요.
+    """
+    return prompt
+
+
+def report_messages(prompt):
+    return [
+        {"role": "system", "content": REPORT_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+# =======================================
+# 보고서 저장소
+# =======================================
+class ReportStore:
+    def __init__(self, data_version, root=REPORT_DIR):
+        self.data_version = data_version
+        self.directory = os.path.join(root, data_version)
+
+    def _path(self, exporter):
+        slug = hashlib.sha1(exporter.encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.directory, f"{slug}.json")
+
+    def history(self, exporter):
+        path = self._path(exporter)
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)['reports']
+
+    def latest(self, exporter):
+        history = self.history(exporter)
+        return history[-1] if history else None
+
+    def save(self, exporter, content, model=REPORT_MODEL, usage=None):
+        os.makedirs(self.directory, exist_ok=True)
+        entry = {
+            'version': len(self.history(exporter)) + 1,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'model': model,
+            'usage': usage,
+            'content': content,
+        }
+        payload = {'exporter': exporter, 'data_version': self.data_version,
+                   'reports': self.history(exporter) + [entry]}
+        path = self._path(exporter)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=1)
+        os.replace(path + '.tmp', path)
+        return entry
+
+
+def usage_dict(response):
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return None
+    return {'prompt_tokens': usage.prompt_tokens, 'completion_tokens': usage.completion_tokens}
+
+
+# =======================================
+# 배치 생성 (비동기)
+# =======================================
+class RateLimiter:
+    # 분당 요청 수 제한: 요청 간 최소 간격 유지
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _retry_after(error):
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+async def _generate_one(client, exporter, df, store, semaphore, limiter, max_retries):
+    import openai
+
+    prompt = build_report_prompt(exporter, df)
+    if prompt is None:
+        return exporter, 'skipped'
+
+    retryable = (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)
+    async with semaphore:
+        for attempt in range(max_retries + 1):
+            await limiter.wait()
+            start = time.perf_counter()
+            try:
+                response = await client.chat.completions.create(model=REPORT_MODEL, messages=report_messages(prompt))
+            except retryable as e:
+                if attempt == max_retries:
+                    return exporter, f'failed: {type(e).__name__}'
+                backoff = _retry_after(e) or min(2 ** attempt, 60) + random.uniform(0, 1)
+                metrics.inc("llm_retries_total", purpose="exporter_report_batch")
+                await asyncio.sleep(backoff)
+                continue
+            except openai.APIError as e:
+                # 재시도해도 같은 오류 (잘못된 요청/인증/콘텐츠 필터 등) → 이 수출자만 실패 처리하고 배치 계속
+                return exporter, f'failed: {type(e).__name__}'
+            metrics.record_llm_usage("exporter_report_batch", response, time.perf_counter() - start)
+            store.save(exporter, response.choices[0].message.content, usage=usage_dict(response))
+            return exporter, 'ok'
+
+
+async def generate_reports(client, exporters, df, store, concurrency=4, requests_per_minute=60,
+                           max_retries=5, force=False):
+    if not force:
+        exporters = [exporter for exporter in exporters if store.latest(exporter) is None]
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(requests_per_minute)
+    tasks = [_generate_one(client, exporter, df, store, semaphore, limiter, max_retries) for exporter in exporters]
+    results = []
+    for finished in asyncio.as_completed(tasks):
+        exporter, status = await finished
+        print(f"[{status}] {exporter}")
+        results.append((exporter, status))
+    return results
+
+
+def _openai_api_key():
+    # 환경변수 우선, 없으면 Streamlit secrets 파일
+    if os.environ.get('OPENAI_API_KEY'):
+        return os.environ['OPENAI_API_KEY']
+    import tomllib
+    with open(os.path.join('.streamlit', 'secrets.toml'), 'rb') as f:
+        return tomllib.load(f)['openai']['api_key']
+
+
+if __name__ == "__main__":
+    from openai import AsyncOpenAI
+
+    parser = argparse.ArgumentParser(description="Generate AI exporter reports for the top-N exporters of a filter")
+    parser.add_argument('--top', type=int, default=50)
+    parser.add_argument('--start-date')
+    parser.add_argument('--end-date')
+    parser.add_argument('--loading-port', default='All')
+    parser.add_argument('--arrival-country', default='All')
+    parser.add_argument('--arrival-port', default='All')
+    parser.add_argument('--region', default='All', help="지역 (아시아, 유럽, 북미, 남미, 아프리카, 오세아니아, 기타)")
+    parser.add_argument('--min-containers', type=int, default=0)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rpm', type=int, default=60, help="분당 최대 요청 수")
+    parser.add_argument('--max-retries', type=int, default=5)
+    parser.add_argument('--force', action='store_true', help="저장된 보고서가 있어도 새로 생성")
+    args = parser.parse_args()
+
+    df = qe.read_shipments()
+    filtered = qe.filter_data(
+        df,
+        args.start_date or df['선적일'].min(),
+        args.end_date or df['선적일'].max(),
+        args.loading_port,
+        args.arrival_port,
+        args.arrival_country,
+        args.min_containers,
+        args.region,
+    )
+    top = qe.rank_exporters(filtered)['수출자'].head(args.top).tolist()
+    store = ReportStore(qe.data_version())
+    client = AsyncOpenAI(api_key=_openai_api_key())
+    results = asyncio.run(generate_reports(client, top, df, store, args.concurrency, args.rpm,
+                                           args.max_retries, args.force))
+    ok = sum(1 for _, status in results if status == 'ok')
+    print(f"{ok}/{len(results)} reports generated -> {store.directory}")
@@ -0,0 +1,103 @@
+import bisect
+import re
+from collections import defaultdict
+
+import numpy as np
+
+from text_normalize import fold_text
+
+# =======================================
+# 수출자 자동완성 검색 인덱스
+#  - 데이터 버전당 한 번 생성 (container.py 에서 st.cache_resource 로 보관)
+#  - 대소문자/공백/구두점/"CO., LTD" 등 법인 표기 차이를 무시
+#  - 접두어(prefix) 검색 + n-gram 부분 일치 검색
+# =======================================
+NGRAM = 3
+MIN_NGRAM_SCORE = 0.5  # 오타 허용 검색의 최소 n-gram 겹침 비율
+
+# 정규화 시 제거하는 법인 표기 (긴 것부터 매칭)
+LEGAL_SUFFIXES = [
+    'co., ltd', 'co.,ltd', 'co ltd', 'co. ltd', 'company limited', 'corporation',
+    'limited', 'company', 'corp', 'inc', 'ltd', 'llc', 'co',
+]
+# 한글 법인 표기는 이름에 붙여 쓰므로 ((주)엘지화학) 단어 경계 없이 제거
+# (NFKC 정규화 후 ㈜ 는 (주) 가 됨)
+KOREAN_CORPORATE_MARKERS = ['주식회사', '유한회사', '(주)', '(유)']
+_LEGAL_RE = re.compile(
+    r'(?<![0-9a-z가-힣])(' + '|'.join(re.escape(s) for s in LEGAL_SUFFIXES) + r')(?![0-9a-z가-힣])'
+)
+_KOREAN_CORPORATE_RE = re.compile('|'.join(re.escape(s) for s in KOREAN_CORPORATE_MARKERS))
+_NON_WORD_RE = re.compile(r'[^0-9a-z가-힣]+')
+
+
+def normalize_name(name):
+    text = fold_text(name)
+    text = _KOREAN_CORPORATE_RE.sub(' ', text)
+    text = _LEGAL_RE.sub(' ', text)
+    return _NON_WORD_RE.sub('', text)
+
+
+def _ngrams(key, n=NGRAM):
+    if len(key) < n:
+        return {key} if key else set()
+    return {key[i:i + n] for i in range(len(key) - n + 1)}
+
+
+class ExporterSearchIndex:
+    def __init__(self, names, weights=None):
+        self.names = list(names)
+        self.keys = [normalize_name(name) for name in self.names]
+        self.weights = np.asarray(weights if weights is not None else np.zeros(len(self.names)), dtype=float)
+
+        # 접두어 검색용 정렬 목록
+        self._sorted = sorted((key, i) for i, key in enumerate(self.keys))
+        self._sorted_keys = [key for key, _ in self._sorted]
+
+        # n-gram 역색인 (bigram 은 2글자 검색어용)
+        postings = defaultdict(list)
+        for i, key in enumerate(self.keys):
+            for gram in _ngrams(key) | _ngrams(key, 2):
+                postings[gram].append(i)
+        self._postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    @classmethod
+    def from_frame(cls, df, name_col='수출자', weight_col='컨테이너수'):
+        totals = df.groupby(name_col)[weight_col].sum()
+        totals.index = totals.index.astype(str)
+        totals = totals.groupby(level=0).sum()
+        return cls(totals.index.tolist(), totals.to_numpy())
+
+    def __len__(self):
+        return len(self.names)
+
+    def _prefix_ids(self, key):
+        lo = bisect.bisect_left(self._sorted_keys, key)
+        hi = bisect.bisect_left(self._sorted_keys, key + '\uffff')
+        return [i for _, i in self._sorted[lo:hi]]
+
+    def search(self, query, limit=20):
+        key = normalize_name(query)
+        if not key:
+            return []
+
+        # 점수: 완전일치 3 > 접두어 2 > 부분 문자열 1 > n-gram 겹침 비율 (MIN_NGRAM_SCORE~1 미만)
+        scores = np.zeros(len(self.names))
+        grams = _ngrams(key) if len(key) >= NGRAM else _ngrams(key, 2)
+        hits = [self._postings[g] for g in grams if g in self._postings]
+        if hits:
+            counts = np.bincount(np.concatenate(hits), minlength=len(self.names))
+            scores = counts / (len(grams) + 1)
+            scores[scores < MIN_NGRAM_SCORE * len(grams) / (len(grams) + 1)] = 0
+            for i in np.flatnonzero(counts == len(grams)):
+                if key in self.keys[i]:
+                    scores[i] = 1.0
+
+        for i in self._prefix_ids(key):
+            scores[i] = 3.0 if self.keys[i] == key else 2.0
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) == 0:
+            return []
+        # 동점이면 컨테이너 물량이 큰 고객 우선
+        order = np.lexsort((-self.weights[candidates], -scores[candidates]))
+        return [self.names[i] for i in candidates[order[:limit]]]
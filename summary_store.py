@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from regions import REGION_COLUMN
+
+# =======================================
+# 일별 요약 저장소 (기간 개요 지표 즉시 조회)
+#  - 선적 건 / 컨테이너 수: 일별 누적합(prefix sum) → 기간 합계 O(1)
+#  - 지역별 컨테이너 수: 지역 x 일 누적합 → 기간 지역 분포 O(지역 수)
+#  - 고유 수출자/항구/국가 수: 일별 정확한 비트맵 + sparse table
+#    → 임의 기간의 합집합을 비트맵 OR 두 번으로 계산
+#  - 선적일이 없는(NaT) 행은 일자 인덱스에서 제외하고 합계/고유값 비트맵을 따로 보관
+#    → 전체 기간을 포함하는 조회에서만 모든 지표에 더함 (len / sum / nunique 와 동일)
+#  - 데이터 버전당 한 번 생성 (container.py 에서 st.cache_resource 로 보관)
+# =======================================
+DISTINCT_COLUMNS = ['수출자', '선적항', '도착지국가', '도착항']
+
+
+def _bitmap(codes, size):
+    flags = np.zeros(size, dtype=bool)
+    flags[codes] = True
+    return int.from_bytes(np.packbits(flags, bitorder='little').tobytes(), 'little')
+
+
+class _RangeUnion:
+    # sparse table: table[k][i] = days[i .. i + 2^k - 1] 비트맵의 OR
+    def __init__(self, day_bitmaps):
+        self.table = [list(day_bitmaps)]
+        span = 1
+        while span * 2 <= len(day_bitmaps):
+            prev = self.table[-1]
+            self.table.append([prev[i] | prev[i + span] for i in range(len(prev) - span)])
+            span *= 2
+
+    def count(self, lo, hi, extra=0):
+        # lo, hi: 포함 구간 일자 인덱스 (lo > hi 이면 빈 구간), extra: 함께 OR 할 비트맵
+        if lo > hi:
+            return extra.bit_count()
+        k = (hi - lo + 1).bit_length() - 1
+        return (self.table[k][lo] | self.table[k][hi - (1 << k) + 1] | extra).bit_count()
+
+
+class DailySummaryStore:
+    def __init__(self, df, distinct_columns=DISTINCT_COLUMNS):
+        dated = df['선적일'].notna().to_numpy()
+        counts = df['컨테이너수'].fillna(0).to_numpy(dtype=float)
+        day = df['선적일'][dated].dt.normalize()
+        self.first_day = day.min()
+        self.last_day = day.max()
+        n_days = (self.last_day - self.first_day).days + 1 if dated.any() else 0
+        self._n_days = n_days
+        day_index = (day - self.first_day).dt.days.to_numpy(dtype=np.int64)
+
+        records = np.bincount(day_index, minlength=n_days)
+        containers = np.bincount(day_index, weights=counts[dated], minlength=n_days)
+        self._records = np.concatenate([[0], np.cumsum(records)])
+        self._containers = np.concatenate([[0], np.cumsum(containers)])
+        self.undated_records = int((~dated).sum())
+        self.undated_containers = float(counts[~dated].sum())
+
+        region_codes, self.regions = pd.factorize(df[REGION_COLUMN], sort=True)
+        valid = (region_codes >= 0) & dated
+        region_days = np.zeros((len(self.regions), n_days))
+        np.add.at(region_days, (region_codes[valid], day_index[valid[dated]]), counts[valid])
+        self._region_containers = np.concatenate([np.zeros((len(self.regions), 1)), np.cumsum(region_days, axis=1)], axis=1)
+        undated_regions = (region_codes >= 0) & ~dated
+        self._undated_region_containers = np.bincount(region_codes[undated_regions], weights=counts[undated_regions],
+                                                      minlength=len(self.regions))
+
+        self._distinct = {}
+        self._undated_distinct = {}
+        for column in distinct_columns:
+            all_codes, uniques = pd.factorize(df[column])  # NaN 은 -1 → 제외 (nunique 와 동일)
+            self._undated_distinct[column] = _bitmap(all_codes[~dated & (all_codes >= 0)], len(uniques))
+            codes = all_codes[dated]
+            valid = codes >= 0
+            pairs = pd.DataFrame({'day': day_index[valid], 'code': codes[valid]}).drop_duplicates()
+            by_day = pairs.groupby('day')['code'].apply(np.asarray)
+            bitmaps = [0] * n_days
+            for d, day_codes in by_day.items():
+                bitmaps[d] = _bitmap(day_codes, len(uniques))
+            self._distinct[column] = _RangeUnion(bitmaps)
+
+    def _day_range(self, start_date, end_date):
+        if self._n_days == 0:
+            return 0, -1
+        start = pd.Timestamp(start_date).normalize() if start_date is not None else self.first_day
+        end = pd.Timestamp(end_date).normalize() if end_date is not None else self.last_day
+        lo = max((start - self.first_day).days, 0)
+        hi = min((end - self.first_day).days, self._n_days - 1)
+        return lo, hi
+
+    def window(self, start_date=None, end_date=None):
+        lo, hi = self._day_range(start_date, end_date)
+        # 선적일 없는 행은 전체 기간 조회에만 포함 (기존 len(df) / sum() 과 동일)
+        full = lo == 0 and hi == self._n_days - 1
+        records = self.undated_records if full else 0
+        containers = self.undated_containers if full else 0.0
+        region_totals = self._undated_region_containers.copy() if full else np.zeros(len(self.regions))
+        if lo <= hi:
+            records += int(self._records[hi + 1] - self._records[lo])
+            containers += self._containers[hi + 1] - self._containers[lo]
+            region_totals += self._region_containers[:, hi + 1] - self._region_containers[:, lo]
+        distinct = {column: union.count(lo, hi, self._undated_distinct[column] if full else 0)
+                    for column, union in self._distinct.items()}
+
+        region_totals = np.rint(region_totals).astype(int)
+        return {
+            'records': records,
+            'containers': int(round(containers)),
+            'regions': {region: int(total) for region, total in zip(self.regions, region_totals) if total > 0},
+            **distinct,
+        }
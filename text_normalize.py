@@ -0,0 +1,14 @@
+import unicodedata
+
+# =======================================
+# 이름 정규화 공통 규칙 (수출자명 검색 / 도착지국가 매핑)
+#  - NFKC (전각 문자, ㈜ → (주)) + casefold
+#  - 악센트: NFKD 로 분리한 결합 문자만 제거 후 NFC 로 한글 음절 재조합
+#    예) 'Société' → 'societe', 'Türkiye' → 'turkiye'
+# =======================================
+
+
+def fold_text(text):
+    text = unicodedata.normalize('NFKC', str(text)).casefold()
+    decomposed = unicodedata.normalize('NFKD', text)
+    return unicodedata.normalize('NFC', ''.join(ch for ch in decomposed if not unicodedata.combining(ch)))